@@ -1,11 +1,24 @@
+import time
 from abc import ABC, abstractmethod
 from ..mcp.protocol import MCPMessage, MessageType
 from ..mcp.broker import broker
+from ..utils.metrics import AGENT_HANDLE_SECONDS, AGENT_ERRORS, QUEUE_WAIT_SECONDS
 
 class BaseAgent(ABC):
+    # Mailbox settings passed to the broker; subclasses override per workload
+    mailbox_workers = 1
+    mailbox_size = None
+    overflow_policy = None
+
     def __init__(self, agent_id: str):
         self.agent_id = agent_id
-        broker.register(self.agent_id, self.receive_message)
+        broker.register(
+            self.agent_id,
+            self.receive_message,
+            workers=self.mailbox_workers,
+            maxsize=self.mailbox_size,
+            policy=self.overflow_policy
+        )
 
     @abstractmethod
     async def process_message(self, message: MCPMessage):
@@ -14,7 +27,16 @@ class BaseAgent(ABC):
 
     async def receive_message(self, message: MCPMessage):
         """Callback for the broker."""
-        await self.process_message(message)
+        # message.timestamp is set when the message is created, so this covers mailbox wait
+        QUEUE_WAIT_SECONDS.observe(max(time.time() - message.timestamp, 0.0), self.agent_id)
+        start = time.perf_counter()
+        try:
+            await self.process_message(message)
+        except Exception:
+            AGENT_ERRORS.inc(self.agent_id)
+            raise
+        finally:
+            AGENT_HANDLE_SECONDS.observe(time.perf_counter() - start, self.agent_id, message.payload.get("task", message.type))
 
     async def send_message(self, receiver: str, type: MessageType, payload: dict, trace_id: str = None):
         """Helper to send messages via broker."""
@@ -26,3 +48,27 @@ class BaseAgent(ABC):
             trace_id=trace_id
         )
         await broker.send(msg)
+
+    async def reply(self, request: MCPMessage, type: MessageType, payload: dict):
+        """Answers `request`; the broker routes the reply to whoever is awaiting it."""
+        msg = MCPMessage(
+            sender=self.agent_id,
+            receiver=request.sender,
+            type=type,
+            payload=payload,
+            trace_id=request.trace_id,
+            in_reply_to=request.message_id
+        )
+        await broker.send(msg)
+
+    def abandoned(self, request: MCPMessage) -> bool:
+        """True once nobody waits for replies to `request` (the requester timed out or was cancelled)."""
+        return not broker.is_pending(request.message_id)
+
+    async def request(self, receiver: str, payload: dict, trace_id: str, timeout: float) -> MCPMessage:
+        """Sends a TASK_REQUEST and waits for its reply. Raises asyncio.TimeoutError."""
+        return await broker.request(receiver, payload, timeout, sender=self.agent_id, trace_id=trace_id)
+
+    def stream(self, receiver: str, payload: dict, trace_id: str, timeout: float):
+        """Sends a TASK_REQUEST and iterates over its partial and final replies."""
+        return broker.stream(receiver, payload, timeout, sender=self.agent_id, trace_id=trace_id)
@@ -1,119 +1,246 @@
 import asyncio
+import hashlib
+import time
 import uuid
+from contextlib import aclosing
 from .base import BaseAgent
-from .ingestion import IngestionAgent
-from .retrieval import RetrievalAgent
+from .. import config
 from .response import LLMResponseAgent
+from ..mcp.broker import MailboxFull
 from ..mcp.protocol import MCPMessage, MessageType
+from ..utils.cache import TTLCache, SemanticCache, normalize_query
+from ..utils.singleflight import SingleFlight
 
 class CoordinatorAgent(BaseAgent):
+    # The coordinator only routes replies, so deliver inline rather than through a mailbox
+    mailbox_workers = 0
+
     def __init__(self):
         super().__init__("CoordinatorAgent")
-        self.pending_requests = {} # trace_id -> future
+
+        # Caches, both dropped whenever the index changes
+        self.index_version = 0
+        self.retrieval_cache = TTLCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+        self.answer_cache = SemanticCache(config.ANSWER_CACHE_SIZE, config.ANSWER_CACHE_TTL, config.ANSWER_CACHE_THRESHOLD)
+        # Identical queries already being answered are joined instead of re-run
+        self.in_flight = SingleFlight()
         
-        # Initialize other agents
-        self.ingestion_agent = IngestionAgent()
-        self.retrieval_agent = RetrievalAgent()
+        # Initialize other agents; with RAG_ROLE=api, ingestion, retrieval and the job queue run in worker
+        # processes (and their modules, with numpy and the parsers, are never imported here)
+        self.ingestion_agent = None
+        self.retrieval_agent = None
+        self.job_agent = None
+        if config.RAG_ROLE == "all":
+            from .ingestion import IngestionAgent
+            from .jobs import JobAgent
+            from .retrieval import RetrievalAgent
+            self.ingestion_agent = IngestionAgent()
+            self.retrieval_agent = RetrievalAgent()
+            # Uploads are ingested in the background; /jobs/{id} reports progress
+            self.job_agent = JobAgent()
         self.llm_agent = LLMResponseAgent()
 
     async def process_message(self, message: MCPMessage):
-        # Handle responses from valid agents
-        if message.trace_id in self.pending_requests:
-            # If we were waiting for this response, set the result
-            # But the flow is multi-step, so we need to know WHICH step we are at.
-            # Simplified flow:
-            # 1. Coordinator blocks on Retrieval
-            # 2. Coordinator blocks on LLM
-            
-            # Since we can't easily block in a simple message handler without proper state machine,
-            # we will assume the Pending Request is an asyncio.Future that the API endpoint is awaiting.
-            # However, since the response comes asynchronously, we need to route it.
-            
-            # For simplicity in this async API:
-            # The API endpoint will subscribe to a specific Trace ID?
-            # Or we simplify and don't use the Broker for the Coordinator -> API return (that's internal).
-            
-            # Let's use a Future store
-            future = self.pending_requests.get(message.trace_id)
-            if future and not future.done():
-                future.set_result(message)
+        if message.type == MessageType.EVENT and message.payload.get("event") == "index_updated":
+            self.invalidate_caches()
 
-    async def handle_user_query(self, query: str):
-        trace_id = str(uuid.uuid4())
-        
-        # Step 1: Retrieve
-        req_msg = MCPMessage(
-            sender=self.agent_id,
-            receiver="RetrievalAgent",
-            type=MessageType.TASK_REQUEST,
-            payload={"task": "retrieve_context", "query": query, "n_results": 3},
-            trace_id=trace_id
-        )
-        
-        # Setup future for Step 1
-        retrieval_future = asyncio.get_running_loop().create_future()
-        self.pending_requests[trace_id] = retrieval_future
-        
-        await self.send_message(req_msg.receiver, req_msg.type, req_msg.payload, req_msg.trace_id)
+    def invalidate_caches(self):
+        self.index_version += 1
+        self.retrieval_cache.clear()
+        self.answer_cache.clear()
+
+    async def retrieval_status(self) -> dict:
+        """Readiness and index layout of the RetrievalAgent, here or in the retrieval process."""
+        if self.retrieval_agent is not None:
+            return await self.retrieval_agent.status()
+        try:
+            reply = await self.request("RetrievalAgent", {"task": "status"}, str(uuid.uuid4()), timeout=5.0)
+        except asyncio.TimeoutError:
+            return {"ready": False, "error": "Retrieval process did not answer"}
+        if reply.type == MessageType.ERROR:
+            return {"ready": False, "error": reply.payload.get("error")}
+        return reply.payload
+
+    def cache_stats(self) -> dict:
+        return {
+            "index_version": self.index_version,
+            "retrieval": self.retrieval_cache.stats(),
+            "answer": self.answer_cache.stats(),
+            "single_flight": self.in_flight.stats(),
+        }
+
+    async def document_task(self, task: str, **payload) -> dict:
+        """Document registry call to the RetrievalAgent: list_documents or delete_document. Returns its payload, or {"error": ...}."""
+        try:
+            reply = await self.request("RetrievalAgent", {"task": task, **payload}, str(uuid.uuid4()), timeout=30.0)
+        except asyncio.TimeoutError:
+            return {"error": "Retrieval process did not answer"}
+        if reply.type == MessageType.ERROR:
+            return {"error": reply.payload.get("error")}
+        return reply.payload
+
+    async def job_task(self, task: str, timeout: float = 30.0, **payload) -> dict:
+        """
+        Ingestion job call to the JobAgent: submit_job, get_job, cancel_job, retry_job or job_stats.
+        Returns its payload, or {"error": ...} (a full queue, or the JobAgent not answering).
+        """
+        try:
+            reply = await self.request("JobAgent", {"task": task, **payload}, str(uuid.uuid4()), timeout=timeout)
+        except asyncio.TimeoutError:
+            return {"error": "Job queue did not answer"}
+        if reply.type == MessageType.ERROR:
+            return {"error": reply.payload.get("error")}
+        return reply.payload
+
+    @staticmethod
+    def fingerprint(context: str) -> str:
+        return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def filters_key(sources: list = None, tags: list = None) -> tuple:
+        """Cache and single-flight key part for a query's document filters."""
+        return tuple(sorted(set(sources or ()))), tuple(sorted(set(tags or ())))
+
+    async def retrieve(self, query: str, trace_id: str, sources: list = None, tags: list = None):
+        """
+        Step 1 of the chat pipeline. Returns (retrieval, error); retrieval holds context and query_embedding.
+        `sources` and `tags` restrict the search to those documents.
+        """
+        key = (normalize_query(query), 3, self.filters_key(sources, tags))
+        cached = self.retrieval_cache.get(key)
+        if cached is not None:
+            return cached, None
         
-        # Wait for Retrieval Result
+        index_version = self.index_version
         try:
-            retrieval_result = await asyncio.wait_for(retrieval_future, timeout=10.0)
+            retrieval_result = await self.request(
+                "RetrievalAgent",
+                {"task": "retrieve_context", "query": query, "n_results": 3, "sources": sources, "tags": tags},
+                trace_id,
+                timeout=10.0
+            )
         except asyncio.TimeoutError:
-            return {"error": "Retrieval timed out"}
+            return None, "Retrieval timed out"
             
         if retrieval_result.type == MessageType.ERROR:
-            return {"error": retrieval_result.payload.get("error")}
-            
-        context = retrieval_result.payload.get("context")
+            return None, retrieval_result.payload.get("error")
         
-        # Step 2: LLM
-        # Reset future for Step 2
-        llm_future = asyncio.get_running_loop().create_future()
-        self.pending_requests[trace_id] = llm_future
+        retrieval = {
+            "context": retrieval_result.payload.get("context"),
+            "query_embedding": retrieval_result.payload.get("query_embedding")
+        }
+        # Don't cache a result that may predate an index update that arrived meanwhile
+        if index_version == self.index_version:
+            self.retrieval_cache.put(key, retrieval)
+        return retrieval, None
+
+    def cached_answer(self, retrieval: dict):
+        if not retrieval["query_embedding"]:
+            return None
+        return self.answer_cache.lookup(retrieval["query_embedding"], self.fingerprint(retrieval["context"]))
+
+    def remember_answer(self, query: str, retrieval: dict, answer: str, index_version: int):
+        if retrieval["query_embedding"] and answer and index_version == self.index_version:
+            self.answer_cache.store(query, retrieval["query_embedding"], self.fingerprint(retrieval["context"]), answer)
+
+    async def handle_user_query(self, query: str, sources: list = None, tags: list = None):
+        """Answers a query, sharing the pipeline run with identical queries already in flight."""
+        try:
+            result = await self.in_flight.do(
+                (normalize_query(query), self.filters_key(sources, tags)),
+                lambda: self.answer_query(query, sources, tags),
+                timeout=config.CHAT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return {"error": "Chat request timed out"}
+        # Each caller gets its own copy of the shared result
+        return dict(result)
+
+    async def answer_query(self, query: str, sources: list = None, tags: list = None):
+        trace_id = str(uuid.uuid4())
+        index_version = self.index_version
         
-        await self.send_message(
-            receiver="LLMResponseAgent",
-            type=MessageType.TASK_REQUEST,
-            payload={"task": "generate_response", "query": query, "context": context},
-            trace_id=trace_id
-        )
+        # Step 1: Retrieve
+        retrieval, error = await self.retrieve(query, trace_id, sources, tags)
+        if error:
+            return {"error": error}
+        context = retrieval["context"]
+        
+        answer = self.cached_answer(retrieval)
+        if answer is not None:
+            return {"answer": answer, "context": context, "trace_id": trace_id, "cached": True}
         
+        # Step 2: LLM
         try:
-            llm_result = await asyncio.wait_for(llm_future, timeout=30.0)
+            llm_result = await self.request(
+                "LLMResponseAgent",
+                {"task": "generate_response", "query": query, "context": context, "deadline": time.time() + config.LLM_TIMEOUT},
+                trace_id,
+                # A little slack so the agent's own deadline error arrives before the broker gives up
+                timeout=config.LLM_TIMEOUT + 1.0
+            )
         except asyncio.TimeoutError:
             return {"error": "LLM response timed out"}
 
-        # Cleanup
-        del self.pending_requests[trace_id]
+        if llm_result.type == MessageType.ERROR:
+            return {"error": llm_result.payload.get("error")}
         
+        answer = llm_result.payload.get("answer")
+        self.remember_answer(query, retrieval, answer, index_version)
         return {
-            "answer": llm_result.payload.get("answer"),
+            "answer": answer,
             "context": context,
             "trace_id": trace_id
         }
 
-    async def handle_file_upload(self, file_path: str, file_name: str):
+    async def stream_user_query(self, query: str, sources: list = None, tags: list = None):
+        """
+        Async generator version of handle_user_query.
+        Yields event dicts: context, then one token per LLM delta, then done (or error).
+        """
         trace_id = str(uuid.uuid4())
+        index_version = self.index_version
         
-        ingest_future = asyncio.get_running_loop().create_future()
-        self.pending_requests[trace_id] = ingest_future
+        # The response headers are sent by now, so a full mailbox (reject policy) becomes an error event
+        try:
+            retrieval, error = await self.retrieve(query, trace_id, sources, tags)
+        except MailboxFull as e:
+            retrieval, error = None, str(e)
+        if error:
+            yield {"type": "error", "error": error, "trace_id": trace_id}
+            return
+        context = retrieval["context"]
         
-        await self.send_message(
-            receiver="IngestionAgent",
-            type=MessageType.TASK_REQUEST,
-            payload={"task": "ingest_file", "file_path": file_path, "file_name": file_name},
-            trace_id=trace_id
-        )
+        yield {"type": "context", "context": context, "trace_id": trace_id}
         
+        answer = self.cached_answer(retrieval)
+        if answer is not None:
+            yield {"type": "token", "delta": answer, "trace_id": trace_id}
+            yield {"type": "done", "answer": answer, "trace_id": trace_id, "cached": True}
+            return
+        
+        replies = self.stream(
+            "LLMResponseAgent",
+            {"task": "stream_response", "query": query, "context": context, "deadline": time.time() + config.LLM_TIMEOUT},
+            trace_id,
+            timeout=config.LLM_TIMEOUT + 1.0
+        )
         try:
-            result = await asyncio.wait_for(ingest_future, timeout=60.0)
-            return result.payload
+            # aclosing: if the client disconnects, release the pending request right away
+            async with aclosing(replies):
+                async for message in replies:
+                    if message.type == MessageType.STREAM_CHUNK:
+                        yield {"type": "token", "delta": message.payload.get("delta", ""), "trace_id": trace_id}
+                    elif message.type == MessageType.ERROR:
+                        yield {"type": "error", "error": message.payload.get("error"), "trace_id": trace_id}
+                    else:
+                        answer = message.payload.get("answer")
+                        self.remember_answer(query, retrieval, answer, index_version)
+                        yield {"type": "done", "answer": answer, "trace_id": trace_id}
         except asyncio.TimeoutError:
-            return {"error": "Ingestion timed out"}
-        finally:
-             if trace_id in self.pending_requests:
-                del self.pending_requests[trace_id]
+            yield {"type": "error", "error": "LLM response timed out", "trace_id": trace_id}
+        except MailboxFull as e:
+            yield {"type": "error", "error": str(e), "trace_id": trace_id}
 
 # Singleton coordinator
 coordinator = CoordinatorAgent()
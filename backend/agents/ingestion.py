@@ -1,13 +1,17 @@
+import asyncio
 import os
-import io
-import pandas as pd
-from pypdf import PdfReader
-from docx import Document
-from pptx import Presentation
 from .base import BaseAgent
+from .. import config
 from ..mcp.protocol import MCPMessage, MessageType
+from ..utils.chunking import TextChunker, RowChunker
+from ..utils.documents import file_sha256
+from ..utils.executors import executors
+from ..utils.metrics import STAGE_SECONDS
+from ..utils.parsers import extract_window, is_tabular
 
 class IngestionAgent(BaseAgent):
+    mailbox_workers = config.INGESTION_WORKERS
+
     def __init__(self):
         super().__init__("IngestionAgent")
     
@@ -17,73 +21,156 @@ class IngestionAgent(BaseAgent):
             if task == "ingest_file":
                 await self.ingest_file(message)
 
+    async def iter_windows(self, file_path: str, file_name: str):
+        """Yields the document's text units one window at a time, parsed in the parse pool."""
+        cursor = 0
+        while cursor is not None:
+            # Parsing is CPU-bound, so keep it off the event loop
+            with STAGE_SECONDS.time("parse"):
+                units, cursor = await executors.run_parse(
+                    extract_window, file_path, file_name, cursor,
+                    window_pages=config.PARSE_WINDOW_PAGES,
+                    window_bytes=config.PARSE_WINDOW_BYTES
+                )
+            yield units
+
+    async def retrieval_task(self, message: MCPMessage, payload: dict) -> dict:
+        """One document registry call to the RetrievalAgent; raises on an error reply."""
+        result = await self.request("RetrievalAgent", payload, message.trace_id, timeout=config.INGEST_IDLE_TIMEOUT)
+        if result.type == MessageType.ERROR:
+            raise RuntimeError(result.payload.get("error"))
+        return result.payload
+
     async def ingest_file(self, message: MCPMessage):
         file_path = message.payload.get("file_path")
         file_name = message.payload.get("file_name")
         
+        # Tables are chunked as whole rows under a repeated header; everything else by characters
+        tabular = is_tabular(file_name)
+        chunker = RowChunker(config.CHUNK_SIZE) if tabular else TextChunker(config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+        metadata = {"source": file_name, "content_type": "table"} if tabular else {"source": file_name}
+        batch = []
+        chunks_count = 0 # chunks produced, i.e. the next chunk index
+        stored = 0 # distinct chunks indexed, as acked by the RetrievalAgent
+        units_count = 0
+        in_flight = None # the embed batch currently being indexed
+        
+        async def flush(chunks: list[str], start_index: int):
+            # At most one batch is indexed while the next one is parsed and chunked
+            nonlocal in_flight, stored
+            if in_flight is not None:
+                stored += await in_flight
+            in_flight = asyncio.create_task(self.embed_batch(message, chunks, metadata, start_index))
+        
         try:
-            text = self.extract_text(file_path, file_name)
-            chunks = self.chunk_text(text)
+            # Re-uploading a file under the same name replaces it: its chunks are written under a new
+            # version, which the RetrievalAgent swaps in (and drops the old one) once all are indexed
+            content_hash = await executors.run_io(file_sha256, file_path)
+            document = await self.retrieval_task(message, {
+                "task": "begin_document",
+                "source": file_name,
+                "content_hash": content_hash,
+                "tags": message.payload.get("tags"),
+                "bytes": await executors.run_io(os.path.getsize, file_path)
+            })
+            version = document["version"]
+            if document["unchanged"]:
+                await self.reply(
+                    message,
+                    type=MessageType.TASK_RESULT,
+                    payload={"status": "unchanged", "file": file_name, "version": version, "chunks_count": document["chunks"], "units_count": 0}
+                )
+                return
+            metadata["version"] = version
             
-            # Send chunks to RetrievalAgent for embedding
-            await self.send_message(
-                receiver="RetrievalAgent",
-                type=MessageType.TASK_REQUEST,
-                payload={
-                    "task": "embed_chunks",
-                    "chunks": chunks,
-                    "metadata": {"source": file_name}
-                },
-                trace_id=message.trace_id
-            )
+            async for units in self.iter_windows(file_path, file_name):
+                for unit in units:
+                    for chunk in chunker.feed(unit):
+                        batch.append(chunk)
+                        if len(batch) >= config.EMBED_BATCH_SIZE:
+                            await flush(batch, chunks_count)
+                            chunks_count += len(batch)
+                            batch = []
+                units_count += len(units)
+                if self.abandoned(message):
+                    # Upload cancelled or timed out: stop parsing instead of indexing for nobody
+                    print(f"[IngestionAgent] Abandoned {file_name} after {units_count} units")
+                    await self.abort(message, file_name, version, in_flight)
+                    return
+                await self.reply(
+                    message,
+                    type=MessageType.PROGRESS,
+                    payload={"file": file_name, "units_parsed": units_count}
+                )
+            
+            batch.extend(chunker.flush())
+            if batch:
+                await flush(batch, chunks_count)
+                chunks_count += len(batch)
+            if in_flight is not None:
+                stored += await in_flight
+            committed = await self.retrieval_task(message, {
+                "task": "commit_document",
+                "source": file_name,
+                "version": version,
+                "chunks": stored
+            })
             
             # Notify Coordinator/User of success
-            await self.send_message(
-                receiver=message.sender,
+            await self.reply(
+                message,
                 type=MessageType.TASK_RESULT,
-                payload={"status": "success", "file": file_name, "chunks_count": len(chunks)},
-                trace_id=message.trace_id
+                payload={"status": "success", "file": file_name, "version": version, "chunks_count": stored,
+                         "units_count": units_count, "chunks_replaced": committed["removed"]}
             )
         except Exception as e:
-            await self.send_message(
-                receiver=message.sender,
+            if "version" in metadata:
+                try:
+                    await self.abort(message, file_name, metadata["version"], in_flight)
+                except Exception as abort_error:
+                    print(f"[IngestionAgent] Could not discard version {metadata['version']} of {file_name}: {abort_error}")
+            await self.reply(
+                message,
                 type=MessageType.ERROR,
-                payload={"error": str(e)},
-                trace_id=message.trace_id
+                payload={"error": str(e)}
             )
 
-    def extract_text(self, file_path: str, file_name: str) -> str:
-        ext = os.path.splitext(file_name)[1].lower()
-        text = ""
+    async def abort(self, message: MCPMessage, file_name: str, version: int, in_flight: asyncio.Task = None):
+        """
+        Discards the chunks written under an uncommitted version. The batch in flight is awaited rather than
+        cancelled: its request would still be handled, and its chunks must not land after the discard.
+        """
+        if in_flight is not None:
+            await asyncio.gather(in_flight, return_exceptions=True)
+        await self.retrieval_task(message, {"task": "abort_document", "source": file_name, "version": version})
+
+    async def embed_batch(self, message: MCPMessage, chunks: list[str], metadata: dict, start_index: int) -> int:
+        """
+        Sends one batch to the RetrievalAgent, waits until it is indexed and reports progress.
+        Returns how many distinct chunks the batch held.
+        """
+        result = await self.request(
+            "RetrievalAgent",
+            {
+                "task": "embed_chunks",
+                "chunks": chunks,
+                "metadata": metadata,
+                "start_index": start_index
+            },
+            message.trace_id,
+            timeout=config.INGEST_IDLE_TIMEOUT
+        )
+        if result.type == MessageType.ERROR:
+            raise RuntimeError(result.payload.get("error"))
         
-        if ext == ".pdf":
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        elif ext == ".docx":
-            doc = Document(file_path)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        elif ext == ".txt" or ext == ".md":
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        elif ext == ".csv":
-            df = pd.read_csv(file_path)
-            text = df.to_string()
-        elif ext == ".pptx":
-            prs = Presentation(file_path)
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-        else:
-            raise ValueError(f"Unsupported file format: {ext}")
-            
-        return text
+        await self.reply(
+            message,
+            type=MessageType.PROGRESS,
+            payload={"file": metadata["source"], "chunks_embedded": start_index + len(chunks)}
+        )
+        return result.payload["indexed"]
 
     def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
         # Simple character-based chunking for now
-        chunks = []
-        for i in range(0, len(text), chunk_size - overlap):
-            chunks.append(text[i:i + chunk_size])
-        return chunks
+        chunker = TextChunker(chunk_size, overlap)
+        return chunker.feed(text) + chunker.flush()
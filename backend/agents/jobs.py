@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from contextlib import aclosing
+from .base import BaseAgent
+from .. import config
+from ..mcp.protocol import MCPMessage, MessageType
+from ..utils.jobs import JobQueue, process_spool_dir
+
+class JobAgent(BaseAgent):
+    """
+    Owns the ingestion job queue. There is exactly one (in the RAG_ROLE=all process, or in the
+    retrieval worker next to the hub), so every API worker sees the same jobs at /jobs/{id}.
+    """
+
+    def __init__(self):
+        super().__init__("JobAgent")
+        self.jobs = JobQueue(
+            self.ingest_file,
+            workers=config.JOB_WORKERS,
+            maxsize=config.JOB_QUEUE_SIZE,
+            spool_dir=process_spool_dir(config.UPLOAD_DIR, "jobs"),
+            history=config.JOB_HISTORY
+        )
+        # get_job requests that wait for a job to finish; they must not hold a mailbox worker
+        self.waiters: set[asyncio.Task] = set()
+
+    async def process_message(self, message: MCPMessage):
+        if message.type == MessageType.TASK_REQUEST:
+            task = message.payload.get("task")
+            try:
+                if task == "submit_job":
+                    await self.submit_job(message)
+                elif task == "get_job":
+                    await self.get_job(message)
+                elif task == "cancel_job":
+                    job = await self.jobs.cancel(message.payload["job_id"])
+                    await self.reply(message, type=MessageType.TASK_RESULT, payload={"job": job.to_dict() if job else None})
+                elif task == "retry_job":
+                    job = self.jobs.retry(message.payload["job_id"])
+                    await self.reply(message, type=MessageType.TASK_RESULT, payload={"job": job.to_dict() if job else None})
+                elif task == "job_stats":
+                    await self.reply(message, type=MessageType.TASK_RESULT, payload=self.jobs.stats())
+            except Exception as e:
+                await self.reply(
+                    message,
+                    type=MessageType.ERROR,
+                    payload={"error": str(e)}
+                )
+
+    async def submit_job(self, message: MCPMessage):
+        """Queues files an API worker spooled under UPLOAD_DIR: payload files is a list of (file name, path)."""
+        payload = message.payload
+        job = await self.jobs.submit([tuple(file) for file in payload["files"]], payload.get("idempotency_key"),
+                                     options=payload.get("options"))
+        await self.reply(message, type=MessageType.TASK_RESULT, payload={"job": job.to_dict()})
+
+    async def get_job(self, message: MCPMessage):
+        """The job's state; with `wait`, answered once the job finishes or after `wait` seconds."""
+        job = self.jobs.get(message.payload["job_id"])
+        wait = message.payload.get("wait")
+        if job is None or not wait or job.finished:
+            await self.reply(message, type=MessageType.TASK_RESULT, payload={"job": job.to_dict() if job else None})
+            return
+
+        async def reply_when_done():
+            try:
+                await asyncio.wait_for(job.done.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            await self.reply(message, type=MessageType.TASK_RESULT, payload={"job": job.to_dict()})
+
+        waiter = asyncio.create_task(reply_when_done())
+        self.waiters.add(waiter)
+        waiter.add_done_callback(self.waiters.discard)
+
+    async def stop(self):
+        for waiter in list(self.waiters):
+            waiter.cancel()
+        await asyncio.gather(*self.waiters, return_exceptions=True)
+        await self.jobs.stop()
+
+    async def ingest_file(self, file_path: str, file_name: str, on_progress=None, tags: list = None):
+        """
+        Ingests one file, replacing an earlier upload with the same name, and returns the IngestionAgent's
+        result (or error) payload. on_progress gets each PROGRESS payload.
+        """
+        trace_id = str(uuid.uuid4())
+
+        # Large files stream in batches, so time out on inactivity rather than total duration
+        replies = self.stream(
+            "IngestionAgent",
+            {"task": "ingest_file", "file_path": file_path, "file_name": file_name, "tags": tags},
+            trace_id,
+            timeout=config.INGEST_IDLE_TIMEOUT
+        )
+        try:
+            async with aclosing(replies):
+                async for result in replies:
+                    if result.type == MessageType.PROGRESS:
+                        if on_progress is not None:
+                            on_progress(result.payload)
+                    else:
+                        return {**result.payload, "trace_id": trace_id}
+        except asyncio.TimeoutError:
+            return {"error": "Ingestion timed out"}
@@ -1,59 +1,112 @@
-import os
-import groq
-from dotenv import load_dotenv
+import time
+from contextlib import aclosing
 from .base import BaseAgent
+from .. import config
+from ..llm import get_provider
 from ..mcp.protocol import MCPMessage, MessageType
+from ..utils.metrics import STAGE_SECONDS, LLM_TOKENS
 
-load_dotenv()
+SYSTEM_PROMPT = (
+    "You are a helpful RAG Chatbot. Use the provided context to answer the user's question. "
+    "If the answer is not in the context, say so. "
+    "Cite the sources if available in the context."
+)
 
 class LLMResponseAgent(BaseAgent):
-    def __init__(self):
+    # One worker per generation the AIMD limiter may allow, so the limiter alone decides concurrency
+    mailbox_workers = config.LLM_MAX_CONCURRENCY
+
+    def __init__(self, provider=None):
         super().__init__("LLMResponseAgent")
-        self.client = groq.Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self._provider = provider
+
+    @property
+    def provider(self):
+        # Built on first use: the Groq SDK and its HTTP pool are slow to import and set up
+        if self._provider is None:
+            self._provider = get_provider()
+        return self._provider
+
+    async def close(self):
+        if self._provider is not None:
+            await self._provider.aclose()
+
+    def stats(self) -> dict:
+        return self._provider.stats() if self._provider is not None else {}
 
     async def process_message(self, message: MCPMessage):
         if message.type == MessageType.TASK_REQUEST:
             task = message.payload.get("task")
             if task == "generate_response":
                 await self.generate_response(message)
+            elif task == "stream_response":
+                await self.stream_response(message)
+
+    def build_messages(self, query: str, context: str) -> list[dict]:
+        user_prompt = f"Context:\n{context}\n\nQuestion: {query}"
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
 
     async def generate_response(self, message: MCPMessage):
         query = message.payload.get("query")
         context = message.payload.get("context", "")
-        
-        system_prompt = (
-            "You are a helpful RAG Chatbot. Use the provided context to answer the user's question. "
-            "If the answer is not in the context, say so. "
-            "Cite the sources if available in the context."
-        )
-        
-        user_prompt = f"Context:\n{context}\n\nQuestion: {query}"
+        deadline = message.payload.get("deadline")
         
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model="llama-3.3-70b-versatile", # Using a good model available on Groq
-                temperature=0.1,
-            )
-            
-            answer = chat_completion.choices[0].message.content
+            with STAGE_SECONDS.time("llm"):
+                answer = await self.provider.complete(self.build_messages(query, context), deadline)
             
-            await self.send_message(
-                receiver=message.sender,
+            await self.reply(
+                message,
                 type=MessageType.TASK_RESULT,
                 payload={
                     "answer": answer,
                     "query": query
-                },
-                trace_id=message.trace_id
+                }
+            )
+        except Exception as e:
+            await self.reply(
+                message,
+                type=MessageType.ERROR,
+                payload={"error": str(e)}
+            )
+
+    async def stream_response(self, message: MCPMessage):
+        """Like generate_response, but emits each token delta as a STREAM_CHUNK before the final TASK_RESULT."""
+        query = message.payload.get("query")
+        context = message.payload.get("context", "")
+        deadline = message.payload.get("deadline")
+        parts = []
+        start = time.perf_counter()
+        
+        try:
+            # aclosing: an error while replying must release the provider's connection and concurrency slot
+            async with aclosing(self.provider.stream(self.build_messages(query, context), deadline)) as deltas:
+                async for delta in deltas:
+                    if not parts:
+                        STAGE_SECONDS.observe(time.perf_counter() - start, "llm_first_token")
+                    LLM_TOKENS.inc()
+                    await self.reply(
+                        message,
+                        type=MessageType.STREAM_CHUNK,
+                        payload={"delta": delta, "index": len(parts)}
+                    )
+                    parts.append(delta)
+            STAGE_SECONDS.observe(time.perf_counter() - start, "llm")
+            
+            await self.reply(
+                message,
+                type=MessageType.TASK_RESULT,
+                payload={
+                    "answer": "".join(parts),
+                    "query": query
+                }
             )
         except Exception as e:
-            await self.send_message(
-                receiver=message.sender,
+            await self.reply(
+                message,
                 type=MessageType.ERROR,
-                payload={"error": str(e)},
-                trace_id=message.trace_id
+                payload={"error": str(e)}
             )
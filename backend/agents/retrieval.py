@@ -1,76 +1,460 @@
-# import chromadb # Moved to lazy init
-# from chromadb.utils import embedding_functions # Moved to lazy init
 from .base import BaseAgent
+from .. import config
 from ..mcp.protocol import MCPMessage, MessageType
+from ..utils.batching import MicroBatcher
+from ..utils.bm25 import BM25Index, reciprocal_rank_fusion
+from ..utils.context import TokenCounter, mmr, merge_adjacent, pack
+from ..utils.documents import DocumentRegistry
+from ..utils.embedding_cache import EmbeddingCache, content_key
+from ..utils.embeddings import SentenceTransformerEncoder
+from ..utils.executors import executors
+from ..utils.metrics import STAGE_SECONDS, CHUNKS_INDEXED, CHUNKS_SKIPPED, RETRIEVAL_BATCH_SIZE, RETRIEVAL_PATH, CONTEXT_TOKENS
+from ..vectorstores import get_vector_store, vector_store_path
+import asyncio
+import hashlib
+import os
+import shutil
 import uuid
 
+def reset_index():
+    """Clean up old DB on restart, unless the index is configured to persist."""
+    db_path = vector_store_path()
+    if config.PERSIST_INDEX:
+        print(f"Persistent mode: reusing database at {db_path}", flush=True)
+        return
+    print(f"Checking database at {db_path}...", flush=True)
+    if os.path.exists(db_path):
+        try:
+            shutil.rmtree(db_path)
+            print(f"Deleted old database at {db_path}", flush=True)
+        except Exception as e:
+            print(f"Warning: Could not delete old database: {e}", flush=True)
+
 class RetrievalAgent(BaseAgent):
+    mailbox_workers = config.RETRIEVAL_WORKERS
+
     def __init__(self):
         super().__init__("RetrievalAgent")
-        self.client = None
+        self.store = None
         self.ef = None
-        self.collection = None
+        self.tokens = None
+        self.cache = None
+        self.documents = None
+        # Lexical index over the same chunks, rebuilt from the store on startup
+        self.lexical = BM25Index() if config.HYBRID_SEARCH else None
+        self.ready = False
+        self.warmup_error = None
+        self._init_lock = asyncio.Lock()
+        # Concurrent retrieve_context requests share one encoder pass and one vector search
+        self.query_batcher = MicroBatcher(
+            self._search_batch,
+            max_batch_size=config.RETRIEVAL_MAX_BATCH,
+            max_wait=config.RETRIEVAL_BATCH_WINDOW_MS / 1000
+        )
 
     def _lazy_init(self):
-        if self.client is None:
-            print("[RetrievalAgent] Lazy initializing ChromaDB and Embeddings...")
-            import chromadb
-            from chromadb.utils import embedding_functions
-            
-            self.client = chromadb.PersistentClient(path="./chroma_db")
-            # Use a simple default embedding function (all-MiniLM-L6-v2 is standard)
-            self.ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-            self.collection = self.client.get_or_create_collection(name="rag_docs", embedding_function=self.ef)
-            print("[RetrievalAgent] Initialization complete.")
+        if self.store is None:
+            print(f"[RetrievalAgent] Lazy initializing {config.VECTOR_BACKEND} vector store and embeddings...")
+            # Use a simple default embedding model (all-MiniLM-L6-v2 is standard)
+            self.ef = SentenceTransformerEncoder(config.EMBEDDING_MODEL)
+            self.tokens = TokenCounter.load(config.CONTEXT_TOKENIZER, getattr(self.ef.model, "tokenizer", None))
+            if config.EMBED_CACHE_PATH:
+                self.cache = EmbeddingCache(config.EMBED_CACHE_PATH)
+            self.documents = DocumentRegistry(os.path.join(vector_store_path(), "documents.json"))
+            store = get_vector_store()
+            if self.lexical is not None:
+                for rows in store.scan():
+                    self.lexical.add(rows["ids"], rows["documents"], [(m or {}).get("source") for m in rows["metadatas"]])
+            # Assigned last: ensure_initialized() lets requests through as soon as the store is set,
+            # and they must not see a half-built lexical index
+            self.store = store
+            print(f"[RetrievalAgent] Initialization complete ({store.count()} chunks indexed, {len(self.documents)} documents).")
+
+    async def ensure_initialized(self):
+        # Loading the model takes seconds; do it in the thread pool, once
+        if self.store is None:
+            async with self._init_lock:
+                await executors.run_io(self._lazy_init)
+
+    async def warm_up(self):
+        """
+        Loads the store and model ahead of the first request and runs one search to warm both; an empty
+        store must answer it too, or /ready reports the error.
+        """
+        try:
+            await self.ensure_initialized()
+            await executors.run_io(self._query, ["warm up"], 1)
+            self.ready = True
+            print("[RetrievalAgent] Warm-up complete.")
+        except Exception as e:
+            self.warmup_error = str(e)
+            print(f"[RetrievalAgent] Warm-up failed: {e}")
+
+    def close(self):
+        """Flushes the vector store to disk. Blocking; called on shutdown."""
+        if self.store is not None:
+            self.store.persist()
+
+    async def status(self) -> dict:
+        """Readiness and index layout, for /ready and /index/stats."""
+        status = {"ready": self.ready, "persistent": config.PERSIST_INDEX}
+        if self.warmup_error:
+            status["error"] = self.warmup_error
+        if self.ready:
+            status["chunks"] = await executors.run_io(self.store.count)
+            status["index"] = await executors.run_io(self.store.stats)
+        return status
 
     async def process_message(self, message: MCPMessage):
+        if message.payload.get("task") == "status":
+            # Answered during warm-up too, so it must not wait for initialization
+            await self.reply(message, type=MessageType.TASK_RESULT, payload=await self.status())
+            return
+
         # Ensure initialized
-        self._lazy_init()
+        await self.ensure_initialized()
         
         if message.type == MessageType.TASK_REQUEST:
             task = message.payload.get("task")
-            if task == "embed_chunks":
-                await self.embed_chunks(message)
-            elif task == "retrieve_context":
-                await self.retrieve_context(message)
+            try:
+                if task == "embed_chunks":
+                    await self.embed_chunks(message)
+                elif task == "retrieve_context":
+                    await self.retrieve_context(message)
+                elif task == "begin_document":
+                    await self.begin_document(message)
+                elif task == "commit_document":
+                    await self.commit_document(message)
+                elif task == "abort_document":
+                    await self.abort_document(message)
+                elif task == "delete_document":
+                    await self.delete_document(message)
+                elif task == "list_documents":
+                    await self.list_documents(message)
+            except Exception as e:
+                await self.reply(
+                    message,
+                    type=MessageType.ERROR,
+                    payload={"error": str(e)}
+                )
+
+    @staticmethod
+    def chunk_id(source: str, text: str, version: int = None) -> str:
+        """Deterministic id, so re-indexing an unchanged chunk of the same version is a no-op instead of a duplicate."""
+        key = f"{source}\0{text}" if version is None else f"{source}\0{version}\0{text}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Encodes texts, reusing cached vectors. Blocking; call from the thread pool."""
+        if self.cache is None:
+            return [list(map(float, v)) for v in self.ef(texts)]
+        
+        keys = [content_key(text, config.EMBEDDING_MODEL) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            encoded = self.ef(list(missing.values()))
+            fresh = {key: list(map(float, vector)) for key, vector in zip(missing, encoded)}
+            self.cache.put_many(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    def _index(self, chunks: list[str], metadata: dict, start_index: int) -> tuple[int, int]:
+        """
+        Adds the chunks that are not indexed yet. Returns (distinct chunks, how many of them were new);
+        repeated chunks share one id and one row. Blocking.
+        """
+        source = metadata.get("source", "")
+        version = metadata.get("version")
+        rows = {}
+        for i, chunk in enumerate(chunks):
+            rows.setdefault(self.chunk_id(source, chunk, version), (chunk, {**metadata, "chunk_index": start_index + i}))
+        
+        existing = self.store.existing_ids(list(rows))
+        new_ids = [chunk_id for chunk_id in rows if chunk_id not in existing]
+        CHUNKS_SKIPPED.inc(amount=len(chunks) - len(new_ids))
+        if not new_ids:
+            return len(rows), 0
+        
+        documents = [rows[chunk_id][0] for chunk_id in new_ids]
+        with STAGE_SECONDS.time("ingest_embed"):
+            embeddings = self.embed_texts(documents)
+        with STAGE_SECONDS.time("ingest_write"):
+            self.store.add(
+                ids=new_ids,
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=[rows[chunk_id][1] for chunk_id in new_ids]
+            )
+        if self.lexical is not None:
+            self.lexical.add(new_ids, documents, [source] * len(new_ids))
+        if version is not None:
+            self.documents.add_uncommitted(source, len(new_ids))
+        CHUNKS_INDEXED.inc(amount=len(new_ids))
+        return len(rows), len(new_ids)
 
     async def embed_chunks(self, message: MCPMessage):
         chunks = message.payload.get("chunks", [])
         metadata = message.payload.get("metadata", {})
+        start_index = message.payload.get("start_index", 0)
         
-        ids = [str(uuid.uuid4()) for _ in chunks]
-        metadatas = [metadata for _ in chunks]
+        # Embedding and the vector store write are blocking; run them in the thread pool
+        indexed, added = await executors.run_io(self._index, chunks, metadata, start_index)
+        if added:
+            await self.notify_index_updated()
         
-        self.collection.add(
-            documents=chunks,
-            metadatas=metadatas,
-            ids=ids
+        # Ack so the sender knows the chunks are searchable
+        await self.reply(
+            message,
+            type=MessageType.TASK_RESULT,
+            payload={"indexed": indexed, "added": added}
+        )
+
+    async def notify_index_updated(self):
+        """Tells the coordinator the collection changed, so it can drop cached retrievals and answers."""
+        await self.send_message(
+            receiver="CoordinatorAgent",
+            type=MessageType.EVENT,
+            payload={"event": "index_updated"},
+            trace_id=str(uuid.uuid4())
+        )
+
+    # Documents
+
+    async def begin_document(self, message: MCPMessage):
+        """Registers a (re)ingestion and tells the IngestionAgent which version to write, or that nothing changed."""
+        payload = message.payload
+        version, unchanged, retagged = await executors.run_io(
+            self.documents.begin, payload["source"], payload["content_hash"], payload.get("tags"), payload.get("bytes")
+        )
+        if retagged:
+            # Tags apply to the committed version right away: tag filters may now select other documents
+            await self.notify_index_updated()
+        entry = self.documents.get(payload["source"])
+        await self.reply(
+            message,
+            type=MessageType.TASK_RESULT,
+            payload={"version": version, "unchanged": unchanged, "chunks": entry["chunks"] if unchanged else None}
         )
-        
-        # Ack (no need to reply to IngestionAgent usually, but good for tracing)
-        # print(f"[RetrievalAgent] Indexed {len(chunks)} chunks.")
+
+    def _commit_document(self, source: str, version: int, chunks: int) -> int:
+        """Makes `version` of a source visible and deletes its other versions' chunks. Blocking."""
+        if not self.documents.commit(source, version, chunks):
+            raise RuntimeError(f"'{source}' was deleted or re-ingested while version {version} was being indexed")
+        rows = self.store.select({"source": source})
+        stale = [(doc_id, document) for doc_id, document, metadata in zip(rows["ids"], rows["documents"], rows["metadatas"])
+                 if (metadata or {}).get("version") != version]
+        return self._remove_chunks(stale)
+
+    def _abort_document(self, source: str, version: int) -> int:
+        """
+        Deletes the chunks of an ingestion that failed or was abandoned. When `version` is still the pending
+        one, chunks of every uncommitted version go (earlier abandoned ones included); else only its own. Blocking.
+        """
+        entry = self.documents.get(source)
+        if entry is None:
+            return 0
+        pending = (entry.get("pending") or {}).get("version")
+        rows = self.store.select({"source": source})
+        stale = [(doc_id, document) for doc_id, document, metadata in zip(rows["ids"], rows["documents"], rows["metadatas"])
+                 if (metadata or {}).get("version") not in (None, entry["version"])
+                 and (pending == version or metadata.get("version") == version)]
+        removed = self._remove_chunks(stale)
+        self.documents.abort(source, version, removed)
+        return removed
+
+    def _delete_document(self, source: str) -> tuple[bool, int]:
+        """Forgets a source and deletes all of its chunks. Blocking."""
+        entry = self.documents.remove(source)
+        rows = self.store.select({"source": source})
+        removed = self._remove_chunks(list(zip(rows["ids"], rows["documents"])))
+        return entry is not None or removed > 0, removed
+
+    def _remove_chunks(self, rows: list[tuple[str, str]]) -> int:
+        if not rows:
+            return 0
+        removed = self.store.delete(ids=[doc_id for doc_id, _ in rows])
+        if self.lexical is not None:
+            self.lexical.remove([doc_id for doc_id, _ in rows], [document for _, document in rows])
+        return removed
+
+    async def commit_document(self, message: MCPMessage):
+        payload = message.payload
+        removed = await executors.run_io(self._commit_document, payload["source"], payload["version"], payload.get("chunks", 0))
+        await self.notify_index_updated()
+        await self.reply(
+            message,
+            type=MessageType.TASK_RESULT,
+            payload={"source": payload["source"], "version": payload["version"], "removed": removed}
+        )
+
+    async def abort_document(self, message: MCPMessage):
+        payload = message.payload
+        removed = await executors.run_io(self._abort_document, payload["source"], payload["version"])
+        await self.reply(
+            message,
+            type=MessageType.TASK_RESULT,
+            payload={"source": payload["source"], "version": payload["version"], "removed": removed}
+        )
+
+    async def delete_document(self, message: MCPMessage):
+        source = message.payload["source"]
+        found, removed = await executors.run_io(self._delete_document, source)
+        if found:
+            await self.notify_index_updated()
+        await self.reply(
+            message,
+            type=MessageType.TASK_RESULT,
+            payload={"source": source, "found": found, "removed": removed}
+        )
+
+    async def list_documents(self, message: MCPMessage):
+        sources = message.payload.get("sources")
+        documents = self.documents.list(message.payload.get("tags"))
+        if sources is not None:
+            documents = [entry for entry in documents if entry["source"] in sources]
+        await self.reply(message, type=MessageType.TASK_RESULT, payload={"documents": documents})
+
+    def visible(self, metadata: dict) -> bool:
+        """
+        Chunks of the committed version only: a document being re-ingested keeps answering from its
+        old version until the new one is complete. Chunks from before the registry have no version.
+        """
+        version = (metadata or {}).get("version")
+        return version is None or version == self.documents.version(metadata.get("source"))
+
+    # Search
+
+    def _query(self, queries: list[str], n_results: int, sources: tuple = None) -> tuple[dict, list]:
+        """
+        Embeds all queries in one encoder call and searches them in one vector query, restricted to
+        `sources` if given. Results may include uncommitted chunks; callers filter with visible(). Blocking.
+        """
+        with STAGE_SECONDS.time("query_embed"):
+            embeddings = [list(map(float, v)) for v in self.ef(queries)]
+        hybrid = self.lexical is not None and len(self.lexical) > 0
+        # A pre-filter, so the store only scores the selected documents' chunks
+        where = {"source": {"$in": list(sources)}} if sources is not None else None
+        # Over-fetch by the chunks of uncommitted versions, so they cannot crowd visible ones out of the top k
+        hidden = self.documents.uncommitted(sources)
+        with STAGE_SECONDS.time("vector_search"):
+            # The hits' stored vectors come back too: MMR in _build_context needs them, and re-encoding would cost an encoder pass
+            results = self.store.query(embeddings, (max(n_results, config.HYBRID_CANDIDATES) if hybrid else n_results) + hidden,
+                                       where=where, include_embeddings=True)
+        if hybrid:
+            with STAGE_SECONDS.time("lexical_search"):
+                results = self._fuse(queries, results, set(sources) if sources is not None else None, hidden)
+        RETRIEVAL_PATH.inc("hybrid" if hybrid else "dense", amount=len(queries))
+        return results, embeddings
+
+    def _fuse(self, queries: list[str], dense: dict, sources: set = None, hidden: int = 0) -> dict:
+        """Merges each query's dense ranking with its BM25 ranking by reciprocal rank fusion. Blocking."""
+        rows = {}
+        for ids, documents, metadatas, vectors in zip(dense["ids"], dense["documents"], dense["metadatas"], dense["embeddings"]):
+            rows.update(zip(ids, zip(documents, metadatas, vectors)))
+        rankings = []
+        for query, dense_ids in zip(queries, dense["ids"]):
+            lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, config.HYBRID_CANDIDATES + hidden, sources)]
+            rankings.append(reciprocal_rank_fusion([dense_ids, lexical_ids], k=config.RRF_K))
+        # Chunks found only by BM25 still need their text, metadata and vector
+        missing = {doc_id for ranking in rankings for doc_id in ranking if doc_id not in rows}
+        if missing:
+            fetched = self.store.get(list(missing), include_embeddings=True)
+            rows.update(zip(fetched["ids"], zip(fetched["documents"], fetched["metadatas"], fetched["embeddings"])))
+        rankings = [[doc_id for doc_id in ranking if doc_id in rows] for ranking in rankings]
+        return {
+            "ids": rankings,
+            "documents": [[rows[doc_id][0] for doc_id in ranking] for ranking in rankings],
+            "metadatas": [[rows[doc_id][1] for doc_id in ranking] for ranking in rankings],
+            "embeddings": [[rows[doc_id][2] for doc_id in ranking] for ranking in rankings],
+        }
+
+    def _lexical_fast_path(self, query: str, n_results: int, sources: tuple = None):
+        """Chunks matched by an identifier in the query, or None to fall through to the encoder. Blocking."""
+        with STAGE_SECONDS.time("lexical_search"):
+            hidden = self.documents.uncommitted(sources)
+            doc_ids = self.lexical.identifier_matches(query, n_results + hidden, set(sources) if sources is not None else None)
+            if not doc_ids:
+                return None
+            rows = self.store.get(doc_ids)
+        found = dict(zip(rows["ids"], zip(rows["documents"], rows["metadatas"])))
+        hits = [found[doc_id] for doc_id in doc_ids if doc_id in found and self.visible(found[doc_id][1])]
+        if not hits or len(hits) > n_results:
+            return None
+        RETRIEVAL_PATH.inc("lexical")
+        return [document for document, _ in hits], [metadata for _, metadata in hits]
+
+    async def _search_batch(self, requests: list[tuple[str, int, tuple]]) -> list[tuple[list, list, list, list]]:
+        """
+        MicroBatcher callback: one (documents, metadatas, chunk vectors, query embedding) per
+        (query, n_results, sources) request. Requests with the same source filter share one search.
+        """
+        RETRIEVAL_BATCH_SIZE.observe(len(requests))
+        groups = {}
+        for i, (_, _, sources) in enumerate(requests):
+            groups.setdefault(sources, []).append(i)
+        answers = [None] * len(requests)
+        for sources, members in groups.items():
+            n_max = max(requests[i][1] for i in members)
+            results, embeddings = await executors.run_io(self._query, [requests[i][0] for i in members], n_max, sources)
+            for i, docs, metas, vectors, embedding in zip(members, results['documents'], results['metadatas'], results['embeddings'], embeddings):
+                hits = [hit for hit in zip(docs, metas, vectors) if self.visible(hit[1])][:requests[i][1]]
+                answers[i] = ([hit[0] for hit in hits], [hit[1] for hit in hits], [hit[2] for hit in hits], embedding)
+        return answers
+
+    def resolve_sources(self, sources: list = None, tags: list = None):
+        """The query's source filter as a sorted tuple (hashable, for batching), or None for the whole corpus."""
+        if not sources and not tags:
+            return None
+        return tuple(sorted(self.documents.sources_for(sources, tags)))
+
+    def _build_context(self, documents: list[str], metadatas: list[dict], n_results: int, vectors: list = None) -> tuple[str, int]:
+        """
+        Picks n_results diverse candidates by MMR over their stored vectors, merges adjacent chunks
+        and packs them into the token budget. Returns (context, tokens). Blocking.
+        """
+        import numpy as np  # Deferred with the rest of the model stack, to keep startup fast
+        with STAGE_SECONDS.time("context"):
+            selected = range(len(documents))
+            if len(documents) > n_results:
+                # The search returns the chunks' vectors; encoding is only a fallback for callers without them
+                embeddings = np.asarray(vectors if vectors is not None else self.embed_texts(documents), dtype=np.float32)
+                selected = mmr(embeddings, n_results, config.CONTEXT_MMR_LAMBDA, config.CONTEXT_DUPLICATE_THRESHOLD)
+            passages = [{"text": documents[i], "metadata": metadatas[i] or {}} for i in selected]
+            passages = merge_adjacent(passages, config.CHUNK_OVERLAP)
+            context, tokens = pack(passages, config.CONTEXT_TOKEN_BUDGET, self.tokens)
+        CONTEXT_TOKENS.observe(tokens)
+        return context, tokens
 
     async def retrieve_context(self, message: MCPMessage):
         query = message.payload.get("query")
         n_results = message.payload.get("n_results", 3)
+        sources = self.resolve_sources(message.payload.get("sources"), message.payload.get("tags"))
         
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+        fast = None
+        if sources == ():
+            # The filters select no document
+            fast = [], []
+        elif self.lexical is not None and config.LEXICAL_FAST_PATH:
+            fast = await executors.run_io(self._lexical_fast_path, query, n_results, sources)
+        if fast is not None:
+            # No query embedding: the coordinator's semantic answer cache is skipped for these
+            documents, metadatas = fast
+            vectors = None
+            query_embedding = None
+        else:
+            # Fetch a wider pool than n_results, so the context builder has something to choose from
+            documents, metadatas, vectors, query_embedding = await self.query_batcher.submit((query, max(n_results, config.CONTEXT_CANDIDATES), sources))
         
-        # Flatten results
-        documents = results['documents'][0] if results['documents'] else []
-        metadatas = results['metadatas'][0] if results['metadatas'] else []
+        context_str, context_tokens = await executors.run_io(self._build_context, documents, metadatas, n_results, vectors)
         
-        context_str = "\n".join([f"Source: {m.get('source', 'unknown')}\nContent: {d}" for d, m in zip(documents, metadatas)])
-        
-        await self.send_message(
-            receiver=message.sender, # Likely LLMResponseAgent or Coordinator
+        await self.reply(
+            message,
             type=MessageType.CONTEXT_RESPONSE,
             payload={
                 "context": context_str,
-                "original_query": query
-            },
-            trace_id=message.trace_id
+                "original_query": query,
+                "query_embedding": query_embedding,
+                "context_tokens": context_tokens
+            }
         )
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# LLM provider: "groq" for the real API, "fake" for an offline stand-in that streams canned tokens
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# OpenAI-compatible endpoint override, e.g. a local mock server (benchmarks/mock_llm_server.py); empty uses Groq's
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+# LLM calls: per-request budget in seconds (the coordinator's deadline), pooled HTTP connections,
+# retries of 429/5xx/connection errors with full-jitter exponential backoff (honouring Retry-After)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "8"))
+# Adaptive (AIMD) concurrency: starts at LLM_CONCURRENCY, grows on success, halves on 429/503
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+# Client-side tokens-per-minute limit (prompt + completion); set it to the account's TPM quota. 0 disables it
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+
+# Delay between tokens emitted by the fake provider (seconds)
+FAKE_LLM_TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02"))
+
+# Process role, for running the agents across processes that exchange messages through a hub on BROKER_SOCKET:
+#   all        every agent in this process (default; no hub)
+#   api        FastAPI + CoordinatorAgent + LLMResponseAgent; scale with `uvicorn --workers N`
+#   retrieval  RetrievalAgent (owns the index and the embedding model) + JobAgent (owns ingestion jobs)
+#              + the message hub: `python -m backend.worker`
+#   ingestion  an IngestionAgent: `python -m backend.worker`, run as many as wanted
+RAG_ROLE = os.getenv("RAG_ROLE", "all").lower()
+BROKER_SOCKET = os.getenv("BROKER_SOCKET", os.path.join(tempfile.gettempdir(), "rag_broker.sock"))
+
+# Broker mailboxes: bounded queue per agent, drained by a pool of consumer tasks
+BROKER_MAILBOX_SIZE = int(os.getenv("BROKER_MAILBOX_SIZE", "100"))
+# What send() does when a mailbox is full: "block" (wait for room), "reject" (raise MailboxFull) or "shed" (drop the oldest message)
+BROKER_OVERFLOW_POLICY = os.getenv("BROKER_OVERFLOW_POLICY", "block").lower()
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "16"))
+# No LLM_WORKERS: the LLMResponseAgent gets LLM_MAX_CONCURRENCY mailbox workers, because each generation holds
+# one for its whole stream. The AIMD limiter above is then the only cap on concurrent generations;
+# a smaller pool would keep its limit from ever growing past the pool size.
+
+# Execution layer: document parsing runs in a process pool, embedding and vector-store calls in a thread pool.
+# PARSE_WORKERS=0 parses in the thread pool instead (handy on platforms where spawning processes is expensive).
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "4"))
+
+# Streaming ingestion: parse a window of pages (or bytes for text files) at a time
+# and hand chunks to the RetrievalAgent in fixed-size embedding batches.
+PARSE_WINDOW_PAGES = int(os.getenv("PARSE_WINDOW_PAGES", "16"))
+PARSE_WINDOW_BYTES = int(os.getenv("PARSE_WINDOW_BYTES", str(1024 * 1024)))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+# Must stay below Chroma's max batch size (5461 on SQLite)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# An upload fails only if no progress is reported for this long
+INGEST_IDLE_TIMEOUT = float(os.getenv("INGEST_IDLE_TIMEOUT", "60"))
+
+# Background ingestion jobs: JOB_WORKERS files are ingested at once and at most JOB_QUEUE_SIZE wait.
+# Uploads are spooled to one directory per process under UPLOAD_DIR, which every process must share;
+# the last JOB_HISTORY jobs stay queryable at /jobs/{id}.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(INGESTION_WORKERS)))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "rag_uploads"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+
+# Embeddings
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Content-addressed embedding cache (SQLite); set to an empty string to disable
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache.sqlite3")
+
+# Chroma store location. By default the index (either backend) is wiped on startup; PERSIST_INDEX=1 keeps and reopens it.
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "rag_docs")
+PERSIST_INDEX = os.getenv("PERSIST_INDEX", "0").lower() in ("1", "true", "yes")
+
+# Vector store backend: "chroma" (ChromaDB) or "numpy" (in-process memory-mapped matrix, no chromadb import)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# numpy backend: location, storage precision ("float32" or "float16") and search mode ("exact" or "ivf")
+VECTOR_PATH = os.getenv("VECTOR_PATH", "./vector_index")
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32").lower()
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "exact").lower()
+# IVF: number of lists (0 = sqrt of the corpus size), lists scanned per query, and the corpus size below which search stays exact
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+IVF_MIN_VECTORS = int(os.getenv("IVF_MIN_VECTORS", "50000"))
+# First-pass compression ("none" or "int8") and candidates re-ranked at full precision per requested result
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+VECTOR_RESCORE = int(os.getenv("VECTOR_RESCORE", "4"))
+
+# Query micro-batching: concurrent retrievals are embedded and searched together
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "16"))
+RETRIEVAL_BATCH_WINDOW_MS = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "5"))
+
+# Hybrid retrieval: a BM25 index over chunk text runs alongside the dense search and the two
+# rankings (HYBRID_CANDIDATES each) are merged with reciprocal rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1").lower() in ("1", "true", "yes")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Lexical fast path: if an identifier in the query (code, SKU, version...) occurs in at most n_results
+# chunks, answer with those chunks and skip the query encoder
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "1").lower() in ("1", "true", "yes")
+
+# Context assembly: pick n_results diverse chunks out of CONTEXT_CANDIDATES by MMR (CONTEXT_MMR_LAMBDA trades
+# relevance against redundancy; chunks at or above CONTEXT_DUPLICATE_THRESHOLD cosine to a picked one are dropped),
+# merge adjacent chunks of the same source and pack the result into CONTEXT_TOKEN_BUDGET tokens
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "8"))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.95"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Tokenizer for the budget: a Hugging Face tokenizer name (ideally the LLM's); empty uses the embedding model's
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "")
+
+# Coordinator caches. Retrieval results are keyed by normalized query; answers are reused for
+# semantically similar queries (cosine >= ANSWER_CACHE_THRESHOLD) that retrieved identical context.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Per-caller budget for a /chat request (identical concurrent queries share one pipeline run)
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "45"))
+
+# Observability
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Message metadata kept for /traces/{trace_id}; oldest records are dropped first
+TRACE_CAPACITY = int(os.getenv("TRACE_CAPACITY", "10000"))
+# Fraction of messages whose (truncated) payload is captured alongside the metadata
+TRACE_PAYLOAD_SAMPLE_RATE = float(os.getenv("TRACE_PAYLOAD_SAMPLE_RATE", "0"))
@@ -0,0 +1,3 @@
+# LLM provider package
+from .providers import LLMProvider, GroqProvider, FakeLLMProvider, get_provider
+from .limits import AdaptiveLimiter, TokenBucket, DeadlineExceeded
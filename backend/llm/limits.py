@@ -0,0 +1,112 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed (or would pass) before the LLM call could complete."""
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for outgoing LLM calls: each success raises the limit by 1/limit
+    (about +1 per round of requests), each overload signal (429/503) multiplies it by `decrease`.
+    Overloads from requests that started before the last decrease are ignored, so one burst of
+    rejections halves the limit once rather than once per request.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 64, decrease: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float = None) -> float:
+        """Waits for a free slot and returns the time it was granted (pass it to on_overload)."""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Granted just as we gave up
+            raise
+        return time.monotonic()
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self):
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self, started: float):
+        if started < self.last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.last_decrease = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "waiting": len(self.waiters)}
+
+
+class TokenBucket:
+    """
+    Tokens-per-minute budget. acquire() reserves an estimate up front and waits while the
+    bucket is short; debit() charges the rest of the actual usage afterwards (it may go negative,
+    which simply delays the next callers).
+    """
+
+    def __init__(self, tokens_per_minute: float, burst: float = None):
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = burst or tokens_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float, timeout: float = None):
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            wait = (amount - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DeadlineExceeded(f"Token budget exhausted; next {int(amount)} tokens free in {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    def debit(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def stats(self) -> dict:
+        self._refill()
+        return {"tokens_per_minute": self.rate * 60, "available": int(self.tokens)}
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+from .. import config
+from ..utils.context import CHARS_PER_TOKEN
+from ..utils.metrics import LLM_RETRIES
+from .limits import AdaptiveLimiter, DeadlineExceeded, TokenBucket, backoff_delay
+
+
+class LLMProvider(ABC):
+    """Async chat-completion backend used by the LLMResponseAgent."""
+
+    @abstractmethod
+    def stream(self, messages: list[dict], deadline: float = None) -> AsyncIterator[str]:
+        """Yields the answer as incremental text deltas. `deadline` is a time.time() the answer must finish by."""
+
+    async def complete(self, messages: list[dict], deadline: float = None) -> str:
+        parts = []
+        async for delta in self.stream(messages, deadline):
+            parts.append(delta)
+        return "".join(parts)
+
+    async def aclose(self):
+        """Releases connections held by the provider."""
+
+    def stats(self) -> dict:
+        return {}
+
+
+# Responses worth retrying; 429 and 503 also mean the backend wants less concurrency
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+OVERLOAD_STATUSES = {429, 503}
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class GroqProvider(LLMProvider):
+    """
+    Groq (or any OpenAI-compatible endpoint via GROQ_BASE_URL) over one pooled HTTP client.
+    Calls pass an AIMD concurrency limiter and an optional tokens-per-minute bucket, and 429/5xx/
+    connection failures before the first token are retried with jittered backoff, all within the deadline.
+    """
+
+    def __init__(self, api_key: str = None, model: str = None, temperature: float = None, base_url: str = None):
+        import groq
+        import httpx
+        self.groq = groq
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=config.LLM_MAX_CONNECTIONS, max_keepalive_connections=config.LLM_MAX_CONNECTIONS),
+            timeout=httpx.Timeout(config.LLM_TIMEOUT, connect=5.0),
+        )
+        # Retries are ours: the SDK's would ignore the limiter and the deadline
+        self.client = groq.AsyncGroq(
+            api_key=api_key or config.GROQ_API_KEY,
+            base_url=base_url or config.GROQ_BASE_URL,
+            http_client=self.http,
+            max_retries=0,
+        )
+        self.model = model or config.LLM_MODEL
+        self.temperature = config.LLM_TEMPERATURE if temperature is None else temperature
+        self.limiter = AdaptiveLimiter(config.LLM_CONCURRENCY, config.LLM_MIN_CONCURRENCY, config.LLM_MAX_CONCURRENCY)
+        self.bucket = TokenBucket(config.LLM_TOKENS_PER_MINUTE) if config.LLM_TOKENS_PER_MINUTE > 0 else None
+
+    def _classify(self, error: Exception) -> tuple[bool, bool, Optional[float]]:
+        """(retryable, overload, retry-after seconds) for an error raised before the first token."""
+        if isinstance(error, self.groq.APIStatusError):
+            status = error.status_code
+            return status in RETRY_STATUSES, status in OVERLOAD_STATUSES, _retry_after(error.response)
+        if isinstance(error, self.groq.APIConnectionError):  # Includes timeouts
+            return True, False, None
+        return False, False, None
+
+    async def stream(self, messages: list[dict], deadline: float = None) -> AsyncIterator[str]:
+        deadline = deadline or time.time() + config.LLM_TIMEOUT
+        prompt_tokens = sum(len(m["content"]) for m in messages) // CHARS_PER_TOKEN
+        attempt = 0
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise DeadlineExceeded("LLM deadline exceeded")
+            if self.bucket is not None:
+                await self.bucket.acquire(prompt_tokens, timeout=remaining)
+            try:
+                started = await self.limiter.acquire(timeout=remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("LLM deadline exceeded waiting for a concurrency slot")
+            yielded = 0
+            try:
+                response = await self.client.chat.completions.create(
+                    messages=messages,
+                    model=self.model,
+                    temperature=self.temperature,
+                    stream=True,
+                    timeout=max(deadline - time.time(), 0.001),
+                )
+                usage = None
+                async with response:
+                    async for chunk in response:
+                        if chunk.x_groq is not None and chunk.x_groq.usage is not None:
+                            usage = chunk.x_groq.usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            yielded += len(delta)
+                            yield delta
+                        if time.time() > deadline:
+                            raise DeadlineExceeded("LLM deadline exceeded while streaming")
+                self.limiter.on_success()
+                if self.bucket is not None:
+                    # The prompt estimate was reserved up front; charge the rest of what was actually used
+                    used = usage.total_tokens if usage is not None else prompt_tokens + yielded // CHARS_PER_TOKEN
+                    self.bucket.debit(max(used - prompt_tokens, 0))
+                return
+            except Exception as e:
+                retryable, overload, retry_after = self._classify(e)
+                if overload:
+                    self.limiter.on_overload(started)
+                # Once tokens went out the answer cannot be restarted transparently
+                if not retryable or yielded or attempt >= config.LLM_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt, config.LLM_RETRY_BASE, config.LLM_RETRY_MAX, retry_after)
+                if time.time() + delay >= deadline:
+                    raise
+                LLM_RETRIES.inc(str(getattr(e, "status_code", "connection")))
+                attempt += 1
+            finally:
+                self.limiter.release()
+            # Back off without holding a slot
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    def stats(self) -> dict:
+        stats = {"concurrency": self.limiter.stats()}
+        if self.bucket is not None:
+            stats["tokens"] = self.bucket.stats()
+        return stats
+
+
+class FakeLLMProvider(LLMProvider):
+    """Offline stand-in that streams a canned answer token by token."""
+
+    def __init__(self, token_delay: float = None, answer: str = None):
+        self.token_delay = config.FAKE_LLM_TOKEN_DELAY if token_delay is None else token_delay
+        self.answer = answer
+
+    def _answer_for(self, messages: list[dict]) -> str:
+        if self.answer is not None:
+            return self.answer
+        question = messages[-1]["content"].rsplit("Question:", 1)[-1].strip()
+        return f"This is a canned answer from the fake LLM for: {question}"
+
+    async def stream(self, messages: list[dict], deadline: float = None) -> AsyncIterator[str]:
+        words = self._answer_for(messages).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+def get_provider(name: str = None) -> LLMProvider:
+    name = (name or config.LLM_PROVIDER).lower()
+    if name == "fake":
+        return FakeLLMProvider()
+    if name == "groq":
+        return GroqProvider()
+    raise ValueError(f"Unknown LLM provider: {name}")
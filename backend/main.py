@@ -1,36 +1,94 @@
 import os
-import uvicorn
+import json
+import asyncio
+import logging
 import shutil
-import tempfile
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+import uvicorn
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 from contextlib import asynccontextmanager
 
-# Clean up old DB on restart
-# Clean up old DB on restart
-db_path = "./chroma_db"
-print(f"Checking database at {db_path}...", flush=True)
-if os.path.exists(db_path):
-    try:
-        shutil.rmtree(db_path)
-        print(f"Deleted old database at {db_path}", flush=True)
-    except Exception as e:
-        print(f"Warning: Could not delete old database: {e}", flush=True)
+from . import config
+logging.basicConfig(level=config.LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
 
 print("Importing agents...", flush=True)
 from .agents.coordinator import coordinator
-from .mcp.broker import broker
+from .mcp.broker import broker, MailboxFull
+from .utils.executors import executors
+from .utils.jobs import process_spool_dir, remove_files, spool
+from .utils.metrics import registry
 print("Agents imported.", flush=True)
 
+# State the agents already track, exported at scrape time
+registry.collected(
+    "rag_mailbox_depth", "Messages waiting in each agent's mailbox.", "gauge", ("agent",),
+    lambda: {(agent,): stats["depth"] for agent, stats in broker.stats()["mailboxes"].items()}
+)
+registry.collected(
+    "rag_mailbox_busy_workers", "Mailbox workers currently handling a message.", "gauge", ("agent",),
+    lambda: {(agent,): stats["busy"] for agent, stats in broker.stats()["mailboxes"].items()}
+)
+registry.collected(
+    "rag_requests_outstanding", "Broker requests awaiting a reply.", "gauge", (),
+    lambda: {(): len(broker.pending)}
+)
+registry.collected(
+    "rag_cache_hits_total", "Coordinator cache hits.", "counter", ("cache",),
+    lambda: {(name,): stats["hits"] for name, stats in coordinator.cache_stats().items() if name in ("retrieval", "answer")}
+)
+registry.collected(
+    "rag_cache_misses_total", "Coordinator cache misses.", "counter", ("cache",),
+    lambda: {(name,): stats["misses"] for name, stats in coordinator.cache_stats().items() if name in ("retrieval", "answer")}
+)
+registry.collected(
+    "rag_ingest_files", "Files in ingestion jobs by status.", "gauge", ("status",),
+    lambda: {(status,): count for status, count in coordinator.job_agent.jobs.stats()["files"].items()} if coordinator.job_agent else {}
+)
+registry.collected(
+    "rag_llm_concurrency_limit", "Current adaptive (AIMD) limit on concurrent LLM calls.", "gauge", (),
+    lambda: {(): stats["concurrency"]["limit"]} if (stats := coordinator.llm_agent.stats()) else {}
+)
+registry.collected(
+    "rag_embedding_cache_hits_total", "Chunk embeddings served from the embedding cache.", "counter", (),
+    lambda: {(): coordinator.retrieval_agent.cache.hits} if coordinator.retrieval_agent and coordinator.retrieval_agent.cache else {}
+)
+registry.collected(
+    "rag_embedding_cache_misses_total", "Chunk embeddings that had to be encoded.", "counter", (),
+    lambda: {(): coordinator.retrieval_agent.cache.misses} if coordinator.retrieval_agent and coordinator.retrieval_agent.cache else {}
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("Starting up Agentic RAG Chatbot...")
+    print(f"Starting up Agentic RAG Chatbot (role: {config.RAG_ROLE})...")
+    retrieval = coordinator.retrieval_agent
+    warmup = None
+    if retrieval is not None:
+        from .agents.retrieval import reset_index
+        reset_index()
+    await broker.start()
+    if config.RAG_ROLE == "api":
+        # The index, model and ingestion live in worker processes behind the hub (see backend/worker.py)
+        await broker.connect(config.BROKER_SOCKET)
+    if retrieval is not None:
+        # Load the vector store and embedding model in the background; /ready reports when done
+        warmup = asyncio.create_task(retrieval.warm_up())
     yield
     # Shutdown
     print("Shutting down...")
+    if warmup is not None:
+        warmup.cancel()
+    if coordinator.job_agent is not None:
+        await coordinator.job_agent.stop()
+    await broker.shutdown()
+    await executors.run_io(shutil.rmtree, SPOOL_DIR, ignore_errors=True)
+    await coordinator.llm_agent.close()
+    if retrieval is not None:
+        await executors.run_io(retrieval.close)
+    executors.shutdown()
 
 import sys
 
@@ -70,40 +128,126 @@ async def root():
 
 class ChatRequest(BaseModel):
     query: str
+    # Restrict retrieval to these uploaded files and/or to files carrying any of these tags
+    sources: Optional[list[str]] = None
+    tags: Optional[list[str]] = None
 
 class ChatResponse(BaseModel):
     answer: str
     context: str
     trace_id: str
 
+# Uploads are copied here, then moved into the JobAgent's own spool directory (possibly in another process)
+SPOOL_DIR = process_spool_dir(config.UPLOAD_DIR, "api")
+
+def parse_tags(tags: Optional[str]) -> Optional[list[str]]:
+    """Comma-separated tags form field; None keeps a re-uploaded file's existing tags."""
+    if tags is None:
+        return None
+    return [tag.strip() for tag in tags.split(",") if tag.strip()]
+
+async def submit_job(uploads: list, idempotency_key: str = None, tags: Optional[list[str]] = None) -> dict:
+    """Spools `(file name, file object)` pairs and queues them as one job with the JobAgent; returns the job."""
+    files = await spool(uploads, SPOOL_DIR)
+    result = await coordinator.job_task("submit_job", files=files, idempotency_key=idempotency_key, options={"tags": tags})
+    if "error" in result:
+        await executors.run_io(remove_files, [path for _, path in files])
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result["job"]
+
+def found_job(result: dict) -> dict:
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    if result["job"] is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown or expired)")
+    return result["job"]
+
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), tags: str = Form(None)):
+    """
+    Single-file upload that waits for ingestion to finish; runs through the same job queue as /jobs.
+    Uploading a file under an existing name replaces that document.
+    """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file filename")
     
-    # Save to temp file
-    suffix = os.path.splitext(file.filename)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
-        
-    try:
-        # Pass to Coordinator
-        result = await coordinator.handle_file_upload(tmp_path, file.filename)
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Cleanup temp file? 
-        # For IngestionAgent that uses open() it might be okay.
-        # But if we delete it too fast, Ingestion might fail if it's async and delayed.
-        # Coordinator.handle_file_upload waits for IngestionAgent, so it is safe to delete here.
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    job = await submit_job([(file.filename, file.file)], tags=parse_tags(tags))
+    
+    # No overall deadline: the ingestion itself fails after INGEST_IDLE_TIMEOUT without progress.
+    # Each get_job call waits up to 30 s for the job to finish.
+    while job["status"] in ("queued", "running"):
+        job = found_job(await coordinator.job_task("get_job", timeout=40.0, job_id=job["job_id"], wait=30.0))
+    result = {"job_id": job["job_id"], **job["files"][0]}
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=500, detail=result["error"] or f"Ingestion {job['status']}")
+    return {"status": "success", "result": result}
+
+@app.post("/jobs", status_code=202)
+async def create_job(files: list[UploadFile] = File(...), tags: str = Form(None), idempotency_key: str = Header(None)):
+    """
+    Queues the uploaded files for background ingestion and returns the job id at once.
+    Re-sending the same Idempotency-Key header returns the existing job instead of a new one.
+    """
+    if not all(file.filename for file in files):
+        raise HTTPException(status_code=400, detail="No file filename")
+    return await submit_job([(file.filename, file.file) for file in files], idempotency_key, parse_tags(tags))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Per-file progress of an ingestion job: status, units parsed, chunks embedded, errors."""
+    return found_job(await coordinator.job_task("get_job", job_id=job_id))
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancels the job's queued and running files. Running files stop at their next parse window."""
+    return found_job(await coordinator.job_task("cancel_job", job_id=job_id))
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Re-queues failed and cancelled files; safe to call repeatedly."""
+    return found_job(await coordinator.job_task("retry_job", job_id=job_id))
+
+@app.get("/documents")
+async def list_documents(tag: list[str] = Query(None)):
+    """Indexed documents with their version, content hash, tags and chunk count; ?tag= filters by tag."""
+    result = await coordinator.document_task("list_documents", tags=tag)
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    return result
+
+@app.get("/documents/{source}")
+async def get_document(source: str):
+    result = await coordinator.document_task("list_documents", sources=[source])
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    if not result["documents"]:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return result["documents"][0]
+
+@app.put("/documents/{source}", status_code=202)
+async def replace_document(source: str, file: UploadFile = File(...), tags: str = Form(None)):
+    """
+    Re-ingests `source` from the uploaded file as a background job. Queries keep seeing the previous
+    version until the new one is fully indexed; then the old chunks are deleted.
+    """
+    return await submit_job([(source, file.file)], tags=parse_tags(tags))
+
+@app.delete("/documents/{source}")
+async def delete_document(source: str):
+    """Removes a document and all of its chunks from the index."""
+    result = await coordinator.document_task("delete_document", source=source)
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+    if not result["found"]:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return result
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    result = await coordinator.handle_user_query(request.query)
+    try:
+        result = await coordinator.handle_user_query(request.query, request.sources, request.tags)
+    except MailboxFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
@@ -115,6 +259,57 @@ async def chat(request: ChatRequest):
         trace_id=result.get("trace_id", "")
     )
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Server-Sent Events: a `context` event, one `token` event per LLM delta, then `done` or `error`."""
+    async def event_source():
+        async for event in coordinator.stream_user_query(request.query, request.sources, request.tags):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the vector store and embedding model are loaded and warm, 503 before."""
+    status = await coordinator.retrieval_status()
+    status.pop("index", None)
+    if status["ready"]:
+        return status
+    return JSONResponse(status_code=503, content=status)
+
+@app.get("/broker/stats")
+async def broker_stats():
+    """Per-agent mailbox depth and throughput counters, plus the ingestion job queue and LLM limits."""
+    return {**broker.stats(), "jobs": await coordinator.job_task("job_stats", timeout=5.0), "llm": coordinator.llm_agent.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of latency histograms, counters and queue depths."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Debug view: metadata of every MCP message recorded for a trace (oldest traces are evicted)."""
+    records = broker.traces.get(trace_id)
+    if records is None:
+        raise HTTPException(status_code=404, detail="Trace not found (unknown or already evicted)")
+    return {"trace_id": trace_id, "messages": records}
+
+@app.get("/index/stats")
+async def index_stats():
+    """Vector store backend, size and layout."""
+    status = await coordinator.retrieval_status()
+    return status.get("index") or {"backend": config.VECTOR_BACKEND, "loaded": False}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the coordinator's retrieval and answer caches."""
+    return coordinator.cache_stats()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
     print(f"Starting server on port {port}...")
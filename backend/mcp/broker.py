@@ -1,32 +1,352 @@
 import asyncio
-from typing import Dict, Callable, Awaitable
-from .protocol import MCPMessage
+import logging
+from typing import Dict, Callable, Awaitable, Optional, AsyncIterator
+from .protocol import MCPMessage, MessageType
+from .tracing import TraceStore, preview
+from .transport import HubClient, error_reply
+from .. import config
+from ..utils.metrics import BROKER_MESSAGES, BROKER_ENQUEUE_SECONDS
+
+logger = logging.getLogger("mcp.broker")
+
+# Intermediate replies; the final reply to a request still follows
+PARTIAL_TYPES = {MessageType.STREAM_CHUNK, MessageType.PROGRESS}
+
+OVERFLOW_POLICIES = ("block", "reject", "shed")
+
+class MailboxFull(Exception):
+    """Raised by send() when the receiver's mailbox is full and its policy is 'reject'."""
+
+class Mailbox:
+    """Bounded queue for one agent, drained by `workers` consumer tasks."""
+
+    def __init__(self, agent_id: str, callback: Callable[[MCPMessage], Awaitable[None]], workers: int, maxsize: int, policy: str,
+                 on_shed: Callable[[MCPMessage], Awaitable[None]] = None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.agent_id = agent_id
+        self.callback = callback
+        # Told about every message dropped by the 'shed' policy, so its requester can fail fast
+        self.on_shed = on_shed
+        self.workers = workers
+        self.maxsize = maxsize
+        self.policy = policy
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: list[asyncio.Task] = []
+        self.loop = None
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.shed = 0
+        self.busy = 0
+        self.max_depth = 0
+
+    def start(self):
+        """(Re)starts the consumer tasks on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.busy = 0
+        self.tasks = [
+            self.loop.create_task(self._consume(), name=f"{self.agent_id}-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def put(self, message: MCPMessage):
+        self.received += 1
+        if self.queue.full():
+            if self.policy == "reject":
+                self.rejected += 1
+                raise MailboxFull(f"Mailbox for '{self.agent_id}' is full ({self.maxsize} messages)")
+            if self.policy == "shed":
+                dropped = self.queue.get_nowait()
+                self.queue.task_done()
+                self.shed += 1
+                logger.warning("Shed message %s for %s (mailbox full)", dropped.message_id, self.agent_id)
+                if self.on_shed is not None:
+                    await self.on_shed(dropped)
+        await self.queue.put(message)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def _consume(self):
+        while True:
+            message = await self.queue.get()
+            self.busy += 1
+            try:
+                await self.callback(message)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception("Error delivering message to %s: %s", self.agent_id, e)
+            finally:
+                self.busy -= 1
+                self.queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "busy": self.busy,
+            "policy": self.policy,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "shed": self.shed,
+        }
+
+class PendingRequest:
+    """Where replies to one outstanding request go: a future for the final reply, plus a queue when streaming."""
+
+    def __init__(self, stream: bool = False):
+        self.future = asyncio.get_running_loop().create_future()
+        self.stream: Optional[asyncio.Queue] = asyncio.Queue() if stream else None
+
+    def deliver(self, message: MCPMessage):
+        if self.stream is not None:
+            self.stream.put_nowait(message)
+        elif message.type not in PARTIAL_TYPES and not self.future.done():
+            self.future.set_result(message)
 
 class MessageBroker:
     def __init__(self):
         self.subscribers: Dict[str, Callable[[MCPMessage], Awaitable[None]]] = {}
-        self.message_log: list[MCPMessage] = []
+        self.mailboxes: Dict[str, Mailbox] = {}
+        # Bounded metadata-only trace log (see tracing.TraceStore)
+        self.traces = TraceStore(config.TRACE_CAPACITY, config.TRACE_PAYLOAD_SAMPLE_RATE)
+        # Outstanding requests, keyed by the request's message_id
+        self.pending: Dict[str, PendingRequest] = {}
+        self.completed_requests = 0
+        self.timed_out_requests = 0
+        self.cancelled_requests = 0
+        self.late_replies = 0
+        # Link to other processes' brokers (see transport.HubClient); None when every agent is local
+        self.transport = None
+        # Requests received from other processes whose final reply has not been sent yet
+        self.remote_requests: set[str] = set()
 
-    def register(self, agent_id: str, callback: Callable[[MCPMessage], Awaitable[None]]):
-        """Registers an agent to receive messages."""
+    def register(self, agent_id: str, callback: Callable[[MCPMessage], Awaitable[None]],
+                 workers: int = 1, maxsize: int = None, policy: str = None):
+        """
+        Registers an agent to receive messages.
+        Requests are queued in a bounded mailbox and handled by `workers` consumer tasks;
+        workers=0 delivers every message inline in the sender's task instead.
+        """
         self.subscribers[agent_id] = callback
-        print(f"[Broker] Registered agent: {agent_id}")
+        if workers > 0:
+            self.mailboxes[agent_id] = Mailbox(
+                agent_id,
+                callback,
+                workers=workers,
+                maxsize=maxsize or config.BROKER_MAILBOX_SIZE,
+                policy=policy or config.BROKER_OVERFLOW_POLICY,
+                on_shed=self._shed,
+            )
+        logger.info("Registered agent: %s (workers=%d)", agent_id, workers)
+
+    def _mailbox(self, agent_id: str) -> Optional[Mailbox]:
+        mailbox = self.mailboxes.get(agent_id)
+        # Consumers are bound to the loop they were started on, so start lazily on first use
+        if mailbox is not None and mailbox.loop is not asyncio.get_running_loop():
+            mailbox.start()
+        return mailbox
+
+    async def start(self):
+        for agent_id in self.mailboxes:
+            self._mailbox(agent_id)
+
+    async def shutdown(self):
+        await asyncio.gather(*(mailbox.stop() for mailbox in self.mailboxes.values()))
+        if self.transport is not None:
+            await self.transport.stop()
+            self.transport = None
 
     async def send(self, message: MCPMessage):
-        """Routes a message to the receiver."""
-        self.message_log.append(message)
+        """Routes a message to the receiver. Requests are enqueued and send returns without waiting for the handler."""
+        self.traces.record(message)
+        BROKER_MESSAGES.inc(message.type)
         
-        # Log for visual tracing aid
-        print(f"[MCP] {message.sender} -> {message.receiver} [{message.type}]: {str(message.payload)[:100]}...")
+        # Log for visual tracing aid; the payload preview is only built when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s -> %s [%s]: %s", message.sender, message.receiver, message.type, preview(message.payload))
 
-        if message.receiver in self.subscribers:
-            try:
-                await self.subscribers[message.receiver](message)
-            except Exception as e:
-                print(f"[Broker] Error delivering message to {message.receiver}: {e}")
-                # Ideally send an ERROR message back to sender
-        else:
-            print(f"[Broker] Warning: Receiver '{message.receiver}' not found.")
+        # Replies go straight to the request that is waiting for them, never through a mailbox
+        if message.in_reply_to is not None:
+            pending = self.pending.get(message.in_reply_to)
+            if pending is not None:
+                pending.deliver(message)
+            elif message.in_reply_to in self.remote_requests:
+                if message.type not in PARTIAL_TYPES:
+                    self.remote_requests.discard(message.in_reply_to)
+                await self._forward(message)
+            else:
+                # The requester already timed out or was cancelled
+                self.late_replies += 1
+                logger.info("Dropping late reply to %s from %s", message.in_reply_to, message.sender)
+            return
+
+        if message.receiver not in self.subscribers:
+            if self.transport is not None:
+                await self._forward(message)
+            else:
+                logger.warning("Receiver '%s' not found.", message.receiver)
+            return
+
+        await self._deliver(message)
+
+    async def _deliver(self, message: MCPMessage):
+        """Hands a message to a local agent: through its mailbox, or inline when it has none."""
+        mailbox = self._mailbox(message.receiver)
+        if mailbox is not None:
+            with BROKER_ENQUEUE_SECONDS.time(message.receiver):
+                await mailbox.put(message)
+            return
+
+        try:
+            await self.subscribers[message.receiver](message)
+        except Exception as e:
+            logger.exception("Error delivering message to %s: %s", message.receiver, e)
+            # Ideally send an ERROR message back to sender
+
+    async def _shed(self, message: MCPMessage):
+        """Answers a request dropped from a full mailbox with an ERROR, instead of letting its sender time out."""
+        if message.type == MessageType.TASK_REQUEST:
+            await self.send(error_reply(message, f"Mailbox for '{message.receiver}' is full; request shed", sender="MessageBroker"))
+
+    async def _forward(self, message: MCPMessage):
+        """Sends a message to another process through the transport; a request that cannot go gets an ERROR reply."""
+        try:
+            await self.transport.send(message)
+        except ConnectionError as e:
+            logger.warning("Could not forward message to %s: %s", message.receiver, e)
+            pending = self.pending.get(message.message_id)
+            if pending is not None:
+                pending.deliver(error_reply(message, str(e)))
+
+    async def connect(self, path: str, timeout: float = 10.0):
+        """Attaches to the message hub at `path`; messages for agents not registered here go through it."""
+        self.transport = HubClient(path, self)
+        await self.transport.start(timeout)
+
+    async def receive(self, message: MCPMessage):
+        """Entry point for messages arriving from other processes."""
+        self.traces.record(message)
+        if message.in_reply_to is not None:
+            pending = self.pending.get(message.in_reply_to)
+            if pending is not None:
+                pending.deliver(message)
+            else:
+                self.late_replies += 1
+            return
+        if message.receiver not in self.subscribers:
+            logger.warning("Receiver '%s' not found.", message.receiver)
+            return
+        if message.type == MessageType.TASK_REQUEST:
+            self.remote_requests.add(message.message_id)
+        try:
+            await self._deliver(message)
+        except MailboxFull as e:
+            self.remote_requests.discard(message.message_id)
+            await self._forward(error_reply(message, str(e)))
+
+    def cancel_remote(self, message_id: str):
+        """The remote requester stopped waiting; agents see it through is_pending()."""
+        self.remote_requests.discard(message_id)
+
+    async def request(self, receiver: str, payload: dict, timeout: float,
+                      sender: str = "broker", trace_id: str = None) -> MCPMessage:
+        """
+        Sends a TASK_REQUEST and waits for its final reply, matched by message_id.
+        Raises asyncio.TimeoutError; the pending entry is removed on timeout or cancellation,
+        so a reply arriving afterwards is dropped instead of reaching some other waiter.
+        """
+        message = self._request_message(receiver, payload, sender, trace_id)
+        pending = PendingRequest()
+        self.pending[message.message_id] = pending
+        try:
+            await self.send(message)
+            reply = await asyncio.wait_for(pending.future, timeout=timeout)
+            self.completed_requests += 1
+            return reply
+        except asyncio.TimeoutError:
+            self.timed_out_requests += 1
+            self._abandon(message)
+            raise
+        except asyncio.CancelledError:
+            self.cancelled_requests += 1
+            self._abandon(message)
+            raise
+        finally:
+            del self.pending[message.message_id]
+
+    async def stream(self, receiver: str, payload: dict, timeout: float,
+                     sender: str = "broker", trace_id: str = None) -> AsyncIterator[MCPMessage]:
+        """
+        Like request(), but yields every reply: partial ones (STREAM_CHUNK, PROGRESS) as they
+        arrive, then the final one. `timeout` is the maximum gap between two replies.
+        """
+        message = self._request_message(receiver, payload, sender, trace_id)
+        pending = PendingRequest(stream=True)
+        self.pending[message.message_id] = pending
+        done = False
+        try:
+            await self.send(message)
+            while not done:
+                try:
+                    reply = await asyncio.wait_for(pending.stream.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    self.timed_out_requests += 1
+                    raise
+                if reply.type not in PARTIAL_TYPES:
+                    done = True
+                    self.completed_requests += 1
+                yield reply
+        except (asyncio.CancelledError, GeneratorExit):
+            if not done:
+                self.cancelled_requests += 1
+            raise
+        finally:
+            del self.pending[message.message_id]
+            if not done:
+                self._abandon(message)
+
+    def _abandon(self, message: MCPMessage):
+        """Lets the process handling a request we stopped waiting for know, so it can stop early."""
+        if self.transport is not None and message.receiver not in self.subscribers:
+            self.transport.cancel(message.message_id)
+
+    def is_pending(self, message_id: str) -> bool:
+        """Whether the sender of request `message_id` (here or in another process) is still waiting for replies."""
+        return message_id in self.pending or message_id in self.remote_requests
+
+    @staticmethod
+    def _request_message(receiver: str, payload: dict, sender: str, trace_id: str = None) -> MCPMessage:
+        extra = {"trace_id": trace_id} if trace_id is not None else {}
+        return MCPMessage(sender=sender, receiver=receiver, type=MessageType.TASK_REQUEST, payload=payload, **extra)
+
+    def stats(self) -> dict:
+        """Queue depth and throughput counters per mailbox, plus request/reply bookkeeping."""
+        return {
+            "mailboxes": {agent_id: mailbox.stats() for agent_id, mailbox in self.mailboxes.items()},
+            "requests": {
+                "outstanding": len(self.pending),
+                "completed": self.completed_requests,
+                "timed_out": self.timed_out_requests,
+                "cancelled": self.cancelled_requests,
+                "late_replies": self.late_replies,
+                "remote": len(self.remote_requests),
+            },
+            "transport": None if self.transport is None else {"hub": self.transport.path, "connected": self.transport.connected.is_set()},
+        }
 
 # Global broker instance for simplicity in this demo
 broker = MessageBroker()
@@ -9,7 +9,10 @@ class MessageType(str, Enum):
     TASK_RESULT = "TASK_RESULT" 
     CONTEXT_REQUEST = "CONTEXT_REQUEST"
     CONTEXT_RESPONSE = "CONTEXT_RESPONSE"
+    STREAM_CHUNK = "STREAM_CHUNK"
+    PROGRESS = "PROGRESS"
     ERROR = "ERROR"
+    EVENT = "EVENT"
     LOG = "LOG"
 
 class MCPMessage(BaseModel):
@@ -20,6 +23,8 @@ class MCPMessage(BaseModel):
     receiver: str
     type: MessageType
     payload: Dict[str, Any] = {}
+    # message_id of the request this message answers; set on every reply
+    in_reply_to: Optional[str] = None
 
     class Config:
         use_enum_values = True
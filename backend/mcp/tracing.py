@@ -0,0 +1,73 @@
+import random
+import reprlib
+import time
+from collections import deque
+from typing import Optional
+from .protocol import MCPMessage
+
+# Bounded repr for sampled payloads: a few items of each list, short strings
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlist = 5
+_payload_repr.maxdict = 10
+_payload_repr.maxstring = 200
+_payload_repr.maxother = 200
+
+def payload_sizes(payload: dict) -> dict:
+    """Cheap size summary: length of each str/list/dict value, without walking or stringifying it."""
+    return {key: len(value) for key, value in payload.items() if isinstance(value, (str, list, tuple, dict))}
+
+def preview(payload: dict) -> str:
+    return _payload_repr.repr(payload)
+
+class TraceStore:
+    """
+    Ring buffer of message metadata (never full payloads), indexed by trace_id.
+    Once `capacity` records are stored, each new record evicts the oldest one.
+    """
+
+    def __init__(self, capacity: int = 10000, payload_sample_rate: float = 0.0):
+        self.capacity = capacity
+        self.payload_sample_rate = payload_sample_rate
+        self._records: deque[dict] = deque()
+        self._by_trace: dict[str, deque[dict]] = {}
+
+    def record(self, message: MCPMessage):
+        if self.capacity <= 0:
+            return
+        if len(self._records) >= self.capacity:
+            self._evict()
+        
+        entry = {
+            "message_id": message.message_id,
+            "trace_id": message.trace_id,
+            "in_reply_to": message.in_reply_to,
+            "sender": message.sender,
+            "receiver": message.receiver,
+            "type": message.type,
+            "timestamp": message.timestamp,
+            "routed_at": time.time(),
+            "payload_sizes": payload_sizes(message.payload),
+        }
+        if self.payload_sample_rate > 0 and random.random() < self.payload_sample_rate:
+            entry["payload"] = preview(message.payload)
+        
+        self._records.append(entry)
+        self._by_trace.setdefault(message.trace_id, deque()).append(entry)
+
+    def _evict(self):
+        oldest = self._records.popleft()
+        trace = self._by_trace[oldest["trace_id"]]
+        # Records of a trace are appended in order, so its oldest is always first
+        trace.popleft()
+        if not trace:
+            del self._by_trace[oldest["trace_id"]]
+
+    def get(self, trace_id: str) -> Optional[list[dict]]:
+        trace = self._by_trace.get(trace_id)
+        return list(trace) if trace is not None else None
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        return list(self._records)[-limit:]
+
+    def __len__(self):
+        return len(self._records)
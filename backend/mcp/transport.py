@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Dict, Optional
+from .protocol import MCPMessage, MessageType
+
+logger = logging.getLogger("mcp.transport")
+
+# Wire format: 4-byte big-endian length, then one JSON frame:
+#   {"hello": [agent ids hosted by the connecting process]}
+#   {"message": <MCPMessage>}
+#   {"cancel": <message_id of a request its sender stopped waiting for>}
+HEADER = struct.Struct(">I")
+
+# Mirrors broker.PARTIAL_TYPES (importing the broker here would be circular)
+PARTIAL_TYPES = {MessageType.STREAM_CHUNK, MessageType.PROGRESS}
+
+
+def write_frame(writer: asyncio.StreamWriter, frame: dict):
+    """Queues one frame on the writer. A single write() call, so concurrent frames never interleave."""
+    data = json.dumps(frame, separators=(",", ":")).encode("utf-8")
+    writer.write(HEADER.pack(len(data)) + data)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Next frame, or None once the peer has closed the connection."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        return json.loads(await reader.readexactly(HEADER.unpack(header)[0]))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+def error_reply(request: MCPMessage, error: str, sender: str = "MessageHub") -> MCPMessage:
+    return MCPMessage(
+        sender=sender,
+        receiver=request.sender,
+        type=MessageType.ERROR,
+        payload={"error": error},
+        trace_id=request.trace_id,
+        in_reply_to=request.message_id
+    )
+
+
+class Connection:
+    """One broker process attached to the hub."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.agents: set[str] = set()
+        # Requests this process is handling, for least-loaded routing
+        self.outstanding = 0
+
+    def send(self, frame: dict):
+        if not self.writer.is_closing():
+            write_frame(self.writer, frame)
+
+
+class Hub:
+    """
+    Routes MCPMessages between broker processes over a Unix domain socket.
+    Requests go to the least-loaded process hosting the receiver; replies follow `in_reply_to`
+    back to the process that sent the request; EVENTs go to every process hosting the receiver.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: set[Connection] = set()
+        # Open requests: message_id -> (requesting connection, handling connection)
+        self.routes: Dict[str, tuple[Connection, Connection]] = {}
+        self.routed = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Stale socket from a previous run
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path)
+        logger.info("Message hub listening on %s", self.path)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            for connection in list(self.connections):
+                connection.writer.close()
+            await self.server.wait_closed()
+            self.server = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def hosts(self, agent_id: str) -> list[Connection]:
+        return [connection for connection in self.connections if agent_id in connection.agents]
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer)
+        self.connections.add(connection)
+        try:
+            while (frame := await read_frame(reader)) is not None:
+                if "hello" in frame:
+                    connection.agents = set(frame["hello"])
+                    logger.info("Process attached hosting %s", sorted(connection.agents))
+                elif "message" in frame:
+                    self._route(connection, MCPMessage(**frame["message"]))
+                elif "cancel" in frame:
+                    self._cancel(frame["cancel"])
+                await writer.drain()
+        except asyncio.CancelledError:
+            pass  # Shutting down; asyncio's stream callback would log a cancelled handler as an error
+        finally:
+            self.connections.discard(connection)
+            self._detach(connection)
+            writer.close()
+
+    def _route(self, origin: Connection, message: MCPMessage):
+        self.routed += 1
+        if message.in_reply_to is not None:
+            route = self.routes.get(message.in_reply_to)
+            if route is None:
+                return  # The requester is gone or already cancelled
+            if message.type not in PARTIAL_TYPES:
+                del self.routes[message.in_reply_to]
+                route[1].outstanding -= 1
+            route[0].send({"message": message.model_dump(mode="json")})
+            return
+
+        hosts = self.hosts(message.receiver)
+        if message.type == MessageType.EVENT:
+            for host in hosts:
+                host.send({"message": message.model_dump(mode="json")})
+            return
+        if not hosts:
+            origin.send({"message": error_reply(message, f"No process hosts '{message.receiver}'").model_dump(mode="json")})
+            return
+        target = min(hosts, key=lambda host: host.outstanding)
+        self.routes[message.message_id] = (origin, target)
+        target.outstanding += 1
+        target.send({"message": message.model_dump(mode="json")})
+
+    def _cancel(self, message_id: str):
+        route = self.routes.pop(message_id, None)
+        if route is not None:
+            route[1].outstanding -= 1
+            route[1].send({"cancel": message_id})
+
+    def _detach(self, connection: Connection):
+        """Fails requests the departed process was handling and cancels the ones it was waiting for."""
+        for message_id, (origin, target) in list(self.routes.items()):
+            if target is connection:
+                del self.routes[message_id]
+                origin.send({"message": MCPMessage(
+                    sender="MessageHub",
+                    receiver="unknown",
+                    type=MessageType.ERROR,
+                    payload={"error": "The process handling this request disconnected"},
+                    in_reply_to=message_id
+                ).model_dump(mode="json")})
+            elif origin is connection:
+                self._cancel(message_id)
+        logger.info("Process detached hosting %s", sorted(connection.agents))
+
+    def stats(self) -> dict:
+        return {
+            "processes": [{"agents": sorted(c.agents), "outstanding": c.outstanding} for c in self.connections],
+            "open_requests": len(self.routes),
+            "routed": self.routed,
+        }
+
+
+class HubClient:
+    """
+    A broker's link to the hub. Announces the agents registered locally, hands incoming frames
+    to the broker, and reconnects with backoff if the hub goes away.
+    """
+
+    def __init__(self, path: str, broker):
+        self.path = path
+        self.broker = broker
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.task: Optional[asyncio.Task] = None
+        self.deliveries: set[asyncio.Task] = set()
+        self.connected = asyncio.Event()
+
+    async def start(self, timeout: float = None):
+        """Connects in the background and waits up to `timeout` seconds for the first connection."""
+        self.task = asyncio.create_task(self._run(), name="hub-client")
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Message hub at %s not reachable yet; still trying", self.path)
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        for task in list(self.deliveries):
+            task.cancel()
+        await asyncio.gather(*self.deliveries, return_exceptions=True)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def _run(self):
+        delay = 0.1
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (FileNotFoundError, ConnectionError) as e:
+                logger.debug("Hub connection failed: %s", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            delay = 0.1
+            self.writer = writer
+            write_frame(writer, {"hello": sorted(self.broker.subscribers)})
+            self.connected.set()
+            logger.info("Connected to message hub at %s", self.path)
+            try:
+                while (frame := await read_frame(reader)) is not None:
+                    if "message" in frame:
+                        message = MCPMessage(**frame["message"])
+                        if message.in_reply_to is not None:
+                            # Replies only wake a waiter and never block
+                            await self.broker.receive(message)
+                        else:
+                            # A full mailbox under the block policy must not stop this loop from reading
+                            # the replies that would drain it
+                            task = asyncio.create_task(self.broker.receive(message))
+                            self.deliveries.add(task)
+                            task.add_done_callback(self._delivered)
+                    elif "cancel" in frame:
+                        self.broker.cancel_remote(frame["cancel"])
+            finally:
+                self.connected.clear()
+                self.writer = None
+                writer.close()
+            logger.warning("Lost connection to message hub; reconnecting")
+
+    def _delivered(self, task: asyncio.Task):
+        self.deliveries.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Delivering a message from the hub failed: %s", task.exception())
+
+    async def send(self, message: MCPMessage):
+        """Forwards a message to the hub. Raises ConnectionError while disconnected."""
+        if self.writer is None:
+            raise ConnectionError(f"Not connected to the message hub at {self.path}")
+        write_frame(self.writer, {"message": message.model_dump(mode="json")})
+        await self.writer.drain()
+
+    def cancel(self, message_id: str):
+        """Tells the handling process that nobody waits for this request anymore. Never blocks."""
+        if self.writer is not None:
+            write_frame(self.writer, {"cancel": message_id})
@@ -0,0 +1,141 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+# Words joined by -, _, . or / stay one token (codes, SKUs, versions, paths); their parts are indexed too
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was were what "
+    "when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-_./]", token) if part not in STOPWORDS)
+    return tokens
+
+
+def is_identifier(token: str) -> bool:
+    """
+    Tokens a dense encoder tends to blur: letters mixed with digits (ab12) or parts joined by
+    -, _, . or / (x-1, v1.2). Bare numbers such as years or counts are ordinary query words.
+    """
+    has_digit = any(c.isdigit() for c in token)
+    has_alpha = any(c.isalpha() for c in token)
+    return (has_digit and has_alpha) or any(c in "-_./" for c in token)
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    """Merges ranked id lists; each list contributes 1 / (k + rank) per id."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    """Incrementally maintained in-memory inverted index with Okapi BM25 scoring. Thread-safe."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        # term -> {doc_id: term frequency}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.lengths: dict[str, int] = {}
+        self.total_length = 0
+        # doc_id -> source document, for searches restricted to some sources
+        self.sources: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, doc_ids: list[str], texts: list[str], sources: list[str] = None):
+        tokenized = [Counter(tokenize(text)) for text in texts]
+        with self.lock:
+            for i, (doc_id, counts) in enumerate(zip(doc_ids, tokenized)):
+                if doc_id in self.lengths:
+                    self._remove(doc_id)
+                if sources is not None:
+                    self.sources[doc_id] = sources[i]
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+                self.lengths[doc_id] = sum(counts.values())
+                self.total_length += self.lengths[doc_id]
+
+    def remove(self, doc_ids: list[str], texts: list[str] = None):
+        """Removes documents. Passing their texts avoids scanning every posting list."""
+        with self.lock:
+            for i, doc_id in enumerate(doc_ids):
+                if doc_id in self.lengths:
+                    self._remove(doc_id, set(tokenize(texts[i])) if texts else None)
+
+    def _remove(self, doc_id: str, terms: set = None):
+        for term in (terms if terms is not None else list(self.postings)):
+            posting = self.postings.get(term)
+            if posting is not None and posting.pop(doc_id, None) is not None and not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        self.sources.pop(doc_id, None)
+
+    def _scores(self, terms: set) -> dict[str, float]:
+        """BM25 score of every document matching at least one term. Call with the lock held."""
+        n = len(self.lengths)
+        if not n:
+            return {}
+        average_length = self.total_length / n
+        scores: dict[str, float] = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k: int, sources: set = None) -> list[tuple[str, float]]:
+        """Top-k (doc_id, score) for the query, among chunks of `sources` if given."""
+        terms = set(tokenize(query))
+        with self.lock:
+            scores = self._scores(terms)
+            if sources is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if self.sources.get(doc_id) in sources}
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def identifier_matches(self, query: str, limit: int, sources: set = None) -> list[str]:
+        """
+        Chunks containing an identifier from the query (code, SKU, version...), best BM25 score first,
+        when there are at most `limit` of them; otherwise (or with no identifier) an empty list.
+        With `sources`, only chunks of those sources count.
+        """
+        terms = set(tokenize(query))
+        identifiers = {term for term in terms if is_identifier(term)}
+        if not identifiers:
+            return []
+        with self.lock:
+            matched = set()
+            for term in identifiers:
+                posting = self.postings.get(term, ())
+                matched.update(posting if sources is None else (d for d in posting if self.sources.get(d) in sources))
+                if len(matched) > limit:
+                    return []
+            if not matched:
+                return []
+            scores = self._scores(terms)
+        return sorted(matched, key=scores.get, reverse=True)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"documents": len(self.lengths), "terms": len(self.postings)}
@@ -0,0 +1,117 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as a cache key."""
+    return " ".join(query.lower().split())
+
+class TTLCache:
+    """LRU cache whose entries also expire `ttl` seconds after insertion."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+def _unit(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+class SemanticCache:
+    """
+    Answer cache matched by query similarity.
+    An entry is reused when the new query's embedding has cosine similarity >= threshold
+    with a cached query AND the retrieved context is identical (same fingerprint),
+    so a hit never answers from different evidence.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, threshold: float = 0.95):
+        self.threshold = threshold
+        # Entries are bucketed by context fingerprint, so a lookup only compares against queries with the same evidence
+        self._entries = TTLCache(maxsize, ttl, on_evict=self._unindex) # (fingerprint, normalized query) -> (unit embedding, answer)
+        self._by_fingerprint: dict[str, set] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, embedding: list[float], fingerprint: str) -> Optional[str]:
+        query = _unit(embedding)
+        best, best_score = None, self.threshold
+        for key in list(self._by_fingerprint.get(fingerprint, ())):
+            entry = self._entries._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._drop(key)
+                continue
+            cached_embedding, answer = entry[1]
+            score = sum(a * b for a, b in zip(query, cached_embedding))
+            if score >= best_score:
+                best, best_score = key, score
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._entries.get(best)[1]
+
+    def store(self, query: str, embedding: list[float], fingerprint: str, answer: str):
+        key = (fingerprint, normalize_query(query))
+        self._entries.put(key, (_unit(embedding), answer))
+        self._by_fingerprint.setdefault(fingerprint, set()).add(key)
+
+    def _drop(self, key):
+        self._entries._data.pop(key, None)
+        self._unindex(key)
+
+    def _unindex(self, key):
+        keys = self._by_fingerprint.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_fingerprint[key[0]]
+
+    def clear(self):
+        self._entries.clear()
+        self._by_fingerprint.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+        }
@@ -0,0 +1,70 @@
+class TextChunker:
+    """
+    Incremental character chunker.
+    Text can be fed in pieces (pages, slides, paragraphs); chunks span piece boundaries
+    and the output is identical to chunking the concatenated text in one go.
+    """
+
+    def __init__(self, chunk_size: int = 500, overlap: int = 50):
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.step = chunk_size - overlap
+        self.buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        """Adds text and returns every chunk that is now complete."""
+        self.buffer += text
+        chunks = []
+        pos = 0
+        while len(self.buffer) - pos >= self.chunk_size:
+            chunks.append(self.buffer[pos:pos + self.chunk_size])
+            pos += self.step
+        # Keep only the unconsumed tail, so the buffer stays around one chunk long
+        self.buffer = self.buffer[pos:]
+        return chunks
+
+    def flush(self) -> list[str]:
+        """Returns the trailing partial chunks and resets the chunker."""
+        chunks = []
+        pos = 0
+        while pos < len(self.buffer):
+            chunks.append(self.buffer[pos:pos + self.chunk_size])
+            pos += self.step
+        self.buffer = ""
+        return chunks
+
+
+class RowChunker:
+    """
+    Groups table rows into chunks of whole rows, each starting with the header row.
+    The first row fed is taken as the header. Rows are added to a chunk while it stays within
+    `chunk_size` characters; a single row longer than that becomes a chunk of its own.
+    """
+
+    def __init__(self, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+        self.header = None
+        self.rows = []
+        self.length = 0
+
+    def feed(self, row: str) -> list[str]:
+        if self.header is None:
+            self.header = row
+            self.length = len(row)
+            return []
+        chunks = []
+        if self.rows and self.length + len(row) + 1 > self.chunk_size:
+            chunks.append(self._take())
+        self.rows.append(row)
+        self.length += len(row) + 1
+        return chunks
+
+    def flush(self) -> list[str]:
+        return [self._take()] if self.rows else []
+
+    def _take(self) -> str:
+        chunk = "\n".join([self.header, *self.rows])
+        self.rows = []
+        self.length = len(self.header)
+        return chunk
@@ -0,0 +1,142 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Rough characters-per-token ratio for English, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """Counts and truncates by tokens with a Hugging Face `tokenizers.Tokenizer`, or estimates from length."""
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer
+        if tokenizer is not None:
+            # Context passages are longer than the encoder's window; count all of them
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+
+    @classmethod
+    def load(cls, name: str = "", fallback=None) -> "TokenCounter":
+        """
+        Tokenizer `name` from the Hugging Face hub (e.g. the LLM's), else a copy of `fallback`'s
+        (a transformers fast tokenizer, such as the embedding model's), else the length estimate.
+        """
+        try:
+            from tokenizers import Tokenizer
+            if name:
+                return cls(Tokenizer.from_pretrained(name))
+            if fallback is not None and hasattr(fallback, "backend_tokenizer"):
+                return cls(Tokenizer.from_str(fallback.backend_tokenizer.to_str()))
+        except Exception as e:
+            print(f"[TokenCounter] Falling back to length estimate: {e}")
+        return cls()
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.tokenizer is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        offsets = self.tokenizer.encode(text, add_special_tokens=False).offsets
+        return text if len(offsets) <= max_tokens else text[:offsets[max_tokens - 1][1]]
+
+
+def mmr(embeddings: "np.ndarray", k: int, lambda_: float = 0.7, duplicate_threshold: float = 0.95) -> list[int]:
+    """
+    Maximal marginal relevance over candidates given in rank order (best first).
+    Relevance is the rank position, redundancy the highest cosine to an already selected candidate;
+    candidates at or above `duplicate_threshold` to a selected one are dropped outright.
+    """
+    import numpy as np  # Deferred: the LLM provider imports this module for CHARS_PER_TOKEN
+    n = len(embeddings)
+    vectors = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+    relevance = 1.0 - np.arange(n) / n
+    selected = [0]
+    redundancy = similarity[0].copy()
+    candidates = [i for i in range(1, n) if redundancy[i] < duplicate_threshold]
+    while candidates and len(selected) < k:
+        best = max(candidates, key=lambda i: lambda_ * relevance[i] - (1 - lambda_) * redundancy[i])
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+        candidates = [i for i in candidates if i != best and redundancy[i] < duplicate_threshold]
+    return selected
+
+
+def merge_overlap(first: str, second: str, max_overlap: int) -> str:
+    """Joins two consecutive chunks, dropping the text the second repeats from the end of the first."""
+    for size in range(min(len(first), len(second), max_overlap), 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+
+def merge_rows(first: str, second: str) -> str:
+    """Joins two consecutive table chunks, keeping one copy of their shared header row."""
+    header, _, rows = second.partition("\n")
+    return first + "\n" + rows if first.startswith(header + "\n") else first + "\n" + second
+
+
+def merge_adjacent(passages: list[dict], max_overlap: int) -> list[dict]:
+    """
+    Merges passages that are consecutive chunks (chunk_index, chunk_index + 1) of the same source.
+    Passages are {"text", "metadata"} in rank order; a merged passage takes the rank of its best part.
+    """
+    by_position = {}
+    for rank, passage in enumerate(passages):
+        index = passage["metadata"].get("chunk_index")
+        if index is not None:
+            by_position[(passage["metadata"].get("source"), index)] = rank
+    merged_into = {}
+    texts = {rank: passage["text"] for rank, passage in enumerate(passages)}
+    # Walk chunks in document order so runs of three or more collapse into one passage
+    for source, index in sorted(by_position, key=lambda key: (str(key[0]), key[1])):
+        previous = by_position.get((source, index - 1))
+        if previous is None:
+            continue
+        head = merged_into.get(previous, previous)
+        rank = by_position[(source, index)]
+        if passages[rank]["metadata"].get("content_type") == "table":
+            texts[head] = merge_rows(texts[head], texts.pop(rank))
+        else:
+            texts[head] = merge_overlap(texts[head], texts.pop(rank), max_overlap)
+        merged_into[rank] = head
+    result = []
+    for rank in range(len(passages)):
+        if rank in texts:
+            # The head of a run is its first chunk; it inherits the best rank among the run's chunks
+            members = [rank] + [r for r, h in merged_into.items() if h == rank]
+            result.append((min(members), {"text": texts[rank], "metadata": passages[rank]["metadata"]}))
+    return [passage for _, passage in sorted(result, key=lambda item: item[0])]
+
+
+def pack(passages: list[dict], budget: int, counter: TokenCounter) -> tuple[str, int]:
+    """
+    Formats passages (rank order) as `Source: ...` blocks, one header per source, adding passages while
+    they fit in `budget` tokens. The best passage is truncated rather than dropped if it alone is too long.
+    Returns (context, tokens used).
+    """
+    blocks: dict[str, list[str]] = {}
+    used = 0
+    for passage in passages:
+        source = passage["metadata"].get("source", "unknown")
+        overhead = counter.count("\n...\n" if source in blocks else f"Source: {source}\nContent: \n")
+        cost = overhead + counter.count(passage["text"])
+        text = passage["text"]
+        if used + cost > budget:
+            if blocks:
+                continue
+            text = counter.truncate(text, budget - overhead)
+            if not text:
+                break
+            cost = overhead + counter.count(text)
+        blocks.setdefault(source, []).append(text)
+        used += cost
+    context = "\n".join(f"Source: {source}\nContent: " + "\n...\n".join(texts) for source, texts in blocks.items())
+    return context, used
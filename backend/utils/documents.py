@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Content hash of a file, read in blocks. Blocking."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentRegistry:
+    """
+    One entry per source (file name): its committed version and content hash, tags and chunk count.
+    Chunks are written under a new version while a document is (re)ingested and become visible
+    when that version is committed; the previous version's chunks are deleted at that point.
+    Until then they are counted as uncommitted, so searches know how many hits they may have to skip.
+    Persisted as a JSON file, rewritten atomically on every change. Thread-safe.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def begin(self, source: str, content_hash: str, tags: Iterable[str] = None, size: int = None) -> tuple[int, bool, bool]:
+        """
+        Starts ingesting `source`. Returns (version to write chunks under, unchanged, retagged); unchanged
+        means the committed version already has this content and only the tags were updated, retagged
+        that they differ from before. A retry of the same content reuses its pending version, so chunks
+        written before a failure count.
+        """
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is None:
+                entry = self.entries[source] = {"source": source, "version": 0, "content_hash": None, "tags": [],
+                                                "chunks": 0, "uncommitted": 0, "bytes": None, "created_at": time.time(), "updated_at": None}
+            retagged = tags is not None and sorted(set(tags)) != entry["tags"]
+            if retagged:
+                entry["tags"] = sorted(set(tags))
+            if entry["version"] and entry["content_hash"] == content_hash:
+                entry.pop("pending", None)
+                self._save()
+                return entry["version"], True, retagged
+            pending = entry.get("pending")
+            if pending is None or pending["content_hash"] != content_hash:
+                latest = max(entry["version"], pending["version"] if pending else 0)
+                pending = entry["pending"] = {"version": latest + 1, "content_hash": content_hash, "bytes": size}
+            self._save()
+            return pending["version"], False, retagged
+
+    def commit(self, source: str, version: int, chunks: int) -> bool:
+        """Makes `version` the visible one. False if the source was deleted or re-ingested meanwhile."""
+        with self.lock:
+            entry = self.entries.get(source)
+            pending = entry.get("pending") if entry else None
+            if pending is None or pending["version"] != version:
+                return False
+            del entry["pending"]
+            entry.update(version=version, content_hash=pending["content_hash"], bytes=pending["bytes"],
+                         chunks=chunks, uncommitted=0, updated_at=time.time())
+            self._save()
+            return True
+
+    def add_uncommitted(self, source: str, chunks: int):
+        """Counts chunks written under a version of `source` that is not committed (yet)."""
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is None or not chunks:
+                return
+            entry["uncommitted"] = entry.get("uncommitted", 0) + chunks
+            self._save()
+
+    def uncommitted(self, sources: Iterable[str] = None) -> int:
+        """Stored chunks a search must not return, over `sources` (all sources if None)."""
+        with self.lock:
+            if sources is None:
+                return sum(entry.get("uncommitted", 0) for entry in self.entries.values())
+            return sum(self.entries[source].get("uncommitted", 0) for source in sources if source in self.entries)
+
+    def abort(self, source: str, version: int, removed: int):
+        """
+        Gives up on ingesting `version` of `source`, whose uncommitted chunks (`removed` of them) were deleted.
+        If it is still the pending version, the pending state goes and nothing counts as uncommitted anymore;
+        a source that never had a committed version is forgotten.
+        """
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is None:
+                return
+            pending = entry.get("pending")
+            if pending is not None and pending["version"] == version:
+                del entry["pending"]
+                entry["uncommitted"] = 0
+                if not entry["version"]:
+                    del self.entries[source]
+            else:
+                entry["uncommitted"] = max(entry.get("uncommitted", 0) - removed, 0)
+            self._save()
+
+    def remove(self, source: str) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.pop(source, None)
+            if entry is not None:
+                self._save()
+            return entry
+
+    def version(self, source: str) -> Optional[int]:
+        """Committed version of `source`, or None if it has none (unknown, deleted or not committed yet)."""
+        entry = self.entries.get(source)
+        return entry["version"] or None if entry else None
+
+    def get(self, source: str) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.get(source)
+            return dict(entry) if entry else None
+
+    def list(self, tags: Iterable[str] = None) -> list[dict]:
+        """Entries carrying any of `tags` (all entries without tags), by source."""
+        wanted = set(tags or ())
+        with self.lock:
+            return [dict(entry) for source, entry in sorted(self.entries.items())
+                    if not wanted or wanted & set(entry["tags"])]
+
+    def sources_for(self, sources: Iterable[str] = None, tags: Iterable[str] = None) -> set[str]:
+        """
+        Sources a query is restricted to: the given sources, narrowed to those with any of `tags`
+        when both are given. Sources unknown to the registry still count (indexes from before it).
+        """
+        with self.lock:
+            if not tags:
+                return set(sources)
+            wanted = set(tags)
+            tagged = {source for source, entry in self.entries.items() if wanted & set(entry["tags"])}
+            return tagged & set(sources) if sources else tagged
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,19 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class SentenceTransformerEncoder:
+    """
+    Text encoder with the same call signature as Chroma's embedding functions (texts -> vectors),
+    so the vector store backends don't need chromadb just to embed.
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def __call__(self, texts: list[str]) -> "np.ndarray":
+        return self.model.encode(list(texts), convert_to_numpy=True)
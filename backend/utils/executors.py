@@ -0,0 +1,54 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .. import config
+
+class ExecutionLayer:
+    """
+    Keeps blocking work off the event loop.
+    CPU-bound parsing goes to a process pool; embedding and vector-store calls
+    (which release the GIL in native code) go to a thread pool.
+    """
+
+    def __init__(self, parse_workers: int = None, embed_threads: int = None):
+        self.parse_workers = config.PARSE_WORKERS if parse_workers is None else parse_workers
+        self.embed_threads = config.EMBED_THREADS if embed_threads is None else embed_threads
+        self._process_pool = None
+        self._thread_pool = None
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # spawn: forking a process that already holds torch/Chroma threads is not safe
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.embed_threads, thread_name_prefix="embed")
+        return self._thread_pool
+
+    async def run_parse(self, fn, *args, **kwargs):
+        """Runs a picklable, module-level function in the parse process pool."""
+        pool = self.process_pool if self.parse_workers > 0 else self.thread_pool
+        return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+    async def run_io(self, fn, *args, **kwargs):
+        """Runs a blocking call (embedding, vector store) in the thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.thread_pool, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait, cancel_futures=True)
+            self._thread_pool = None
+
+# Shared execution layer
+executors = ExecutionLayer()
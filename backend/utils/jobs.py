@@ -0,0 +1,300 @@
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, BinaryIO, Callable, Optional
+from .executors import executors
+
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+class JobQueueFull(Exception):
+    """Raised when accepting a submission or retry would exceed the queue's capacity."""
+
+def process_spool_dir(base: str, role: str) -> str:
+    """A directory under `base` that only this process writes to, so it can clean it up on its own."""
+    return os.path.join(base, f"{role}-{os.getpid()}")
+
+def _copy(source: BinaryIO, path: str) -> int:
+    with open(path, "wb") as f:
+        shutil.copyfileobj(source, f)
+        return f.tell()
+
+async def spool(uploads: list[tuple[str, BinaryIO]], directory: str) -> list[tuple[str, str]]:
+    """Copies `(file name, file object)` pairs to new files in `directory`; returns `(file name, path)` pairs."""
+    await executors.run_io(os.makedirs, directory, exist_ok=True)
+    files = []
+    for name, source in uploads:
+        # Keep the extension: parsers dispatch on it
+        path = os.path.join(directory, f"{uuid.uuid4().hex}{os.path.splitext(name)[1]}")
+        await executors.run_io(_copy, source, path)
+        files.append((name, path))
+    return files
+
+def remove_files(paths: list[str]):
+    """Deletes spooled files, ignoring those already gone. Blocking."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class FileTask:
+    """One file of a job: its spooled copy on disk and its ingestion progress."""
+
+    def __init__(self, job: "Job", index: int, name: str, path: str, size: int):
+        self.job = job
+        self.index = index
+        self.name = name
+        self.path = path
+        self.size = size
+        self.runner: Optional[asyncio.Task] = None
+        self.attempts = 0
+        self.reset()
+
+    def reset(self):
+        self.status = "queued"
+        self.units_parsed = 0
+        self.chunks_embedded = 0
+        self.chunks_count = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def progress(self, payload: dict):
+        """Applies an ingestion PROGRESS payload (units_parsed and/or chunks_embedded)."""
+        self.units_parsed = payload.get("units_parsed", self.units_parsed)
+        self.chunks_embedded = payload.get("chunks_embedded", self.chunks_embedded)
+
+    def to_dict(self) -> dict:
+        return {
+            "file": self.name,
+            "bytes": self.size,
+            "status": self.status,
+            "units_parsed": self.units_parsed,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_count": self.chunks_count,
+            "attempts": self.attempts,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class Job:
+    def __init__(self, job_id: str, idempotency_key: str = None, options: dict = None):
+        self.job_id = job_id
+        self.idempotency_key = idempotency_key
+        # Extra keyword arguments for every file's run() call
+        self.options = options or {}
+        self.created_at = time.time()
+        self.files: list[FileTask] = []
+        self.done = asyncio.Event()
+
+    @property
+    def status(self) -> str:
+        states = [task.status for task in self.files]
+        if any(state not in FINAL_STATES for state in states):
+            return "running" if any(state != "queued" for state in states) else "queued"
+        if all(state == "succeeded" for state in states):
+            return "succeeded"
+        if all(state == "cancelled" for state in states):
+            return "cancelled"
+        # Some files failed or were cancelled; retry() re-runs only those
+        return "partial" if "succeeded" in states else "failed"
+
+    @property
+    def finished(self) -> bool:
+        return all(task.status in FINAL_STATES for task in self.files)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            **self.options,
+            "files": [task.to_dict() for task in self.files],
+            "chunks_embedded": sum(task.chunks_embedded for task in self.files),
+        }
+
+class JobQueue:
+    """
+    Background ingestion: submitted files (already spooled to disk) are moved into `spool_dir` and queued,
+    and `workers` tasks run them through `run(path, name, on_progress, **job.options)` one file each.
+    At most `maxsize` files wait. Finished jobs are kept (with the spooled files of failed ones, for retry)
+    up to `history` jobs. `spool_dir` belongs to this queue alone: stop() deletes it.
+    """
+
+    def __init__(self, run: Callable[..., Awaitable[dict]],
+                 workers: int = 2, maxsize: int = 100, spool_dir: str = None, history: int = 1000):
+        self.run = run
+        self.workers = workers
+        self.maxsize = maxsize
+        self.spool_dir = spool_dir
+        self.history = history
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.by_key: dict[str, str] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: list[asyncio.Task] = []
+        self.loop = None
+
+    def _ensure_started(self):
+        # Workers are bound to the loop they run on, so (re)start lazily like broker mailboxes
+        if self.loop is not asyncio.get_running_loop():
+            self.loop = asyncio.get_running_loop()
+            self.queue = asyncio.Queue()
+            self.tasks = [self.loop.create_task(self._worker(), name=f"ingest-job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self):
+        for job_id in list(self.jobs):
+            await self.cancel(job_id)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.loop = None
+        # Jobs live in memory only, so their spooled files are useless after a restart; other
+        # processes' directories under the same UPLOAD_DIR are left alone
+        await executors.run_io(shutil.rmtree, self.spool_dir, ignore_errors=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def submit(self, files: list[tuple[str, str]], idempotency_key: str = None, options: dict = None) -> Job:
+        """
+        Queues `(file name, spooled path)` pairs as one job and returns at once. The queue takes the
+        files over: they are moved into the job's directory, or deleted if no new job is created.
+        """
+        self._ensure_started()
+        paths = [path for _, path in files]
+        if idempotency_key and idempotency_key in self.by_key and self.by_key[idempotency_key] in self.jobs:
+            await executors.run_io(remove_files, paths)
+            return self.jobs[self.by_key[idempotency_key]]
+        if self.queue.qsize() + len(files) > self.maxsize:
+            await executors.run_io(remove_files, paths)
+            raise JobQueueFull(f"Ingestion queue is full ({self.maxsize} files)")
+
+        job = Job(str(uuid.uuid4()), idempotency_key, options)
+        job_dir = os.path.join(self.spool_dir, job.job_id)
+        await executors.run_io(os.makedirs, job_dir, exist_ok=True)
+        for index, (name, spooled) in enumerate(files):
+            path = os.path.join(job_dir, f"{index}{os.path.splitext(name)[1]}")
+            size = await executors.run_io(self._adopt, spooled, path)
+            job.files.append(FileTask(job, index, name, path, size))
+
+        self.jobs[job.job_id] = job
+        if idempotency_key:
+            self.by_key[idempotency_key] = job.job_id
+        for task in job.files:
+            self.queue.put_nowait(task)
+        for job_dir in self._evict():
+            await executors.run_io(shutil.rmtree, job_dir, ignore_errors=True)
+        return job
+
+    @staticmethod
+    def _adopt(spooled: str, path: str) -> int:
+        # A rename, not a copy: every spool directory lives under the same UPLOAD_DIR
+        os.replace(spooled, path)
+        return os.path.getsize(path)
+
+    async def cancel(self, job_id: str, wait: float = 1.0) -> Optional[Job]:
+        """
+        Cancels the job's queued and running files; finished files are left as they are.
+        Waits up to `wait` seconds for running files to stop, so the returned job reflects it.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        runners = set()
+        for task in job.files:
+            if task.status == "queued":
+                task.status = "cancelled"
+                task.finished_at = time.time()
+            elif task.status == "running" and task.runner is not None:
+                task.runner.cancel()
+                runners.add(task.runner)
+        if runners:
+            await asyncio.wait(runners, timeout=wait)
+        self._check_done(job)
+        return job
+
+    def retry(self, job_id: str) -> Optional[Job]:
+        """
+        Re-queues the job's failed and cancelled files. Idempotent: queued, running and succeeded
+        files are untouched, and re-ingesting a file only adds chunks that are not indexed yet.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        self._ensure_started()
+        retry = [task for task in job.files if task.status in ("failed", "cancelled")]
+        if self.queue.qsize() + len(retry) > self.maxsize:
+            raise JobQueueFull(f"Ingestion queue is full ({self.maxsize} files)")
+        for task in retry:
+            task.reset()
+            self.queue.put_nowait(task)
+        if retry:
+            job.done.clear()
+        return job
+
+    async def _worker(self):
+        while True:
+            task = await self.queue.get()
+            try:
+                if task.status != "queued":
+                    continue  # Cancelled while waiting
+                task.runner = asyncio.create_task(self._run(task))
+                # wait() rather than await: cancelling the file must not cancel the worker
+                await asyncio.wait({task.runner})
+            finally:
+                task.runner = None
+                self.queue.task_done()
+
+    async def _run(self, task: FileTask):
+        task.status = "running"
+        task.attempts += 1
+        task.started_at = time.time()
+        try:
+            result = await self.run(task.path, task.name, task.progress, **task.job.options)
+            if result.get("error"):
+                task.status = "failed"
+                task.error = result["error"]
+            else:
+                task.status = "succeeded"
+                task.chunks_count = result.get("chunks_count")
+                await executors.run_io(remove_files, [task.path])
+        except asyncio.CancelledError:
+            task.status = "cancelled"
+        except Exception as e:
+            task.status = "failed"
+            task.error = str(e)
+        finally:
+            task.finished_at = time.time()
+            self._check_done(task.job)
+
+    def _check_done(self, job: Job):
+        if job.finished:
+            job.done.set()
+
+    def _evict(self) -> list[str]:
+        """Forgets the oldest finished jobs beyond `history` and returns their spool directories."""
+        excess = len(self.jobs) - self.history
+        evicted = [job_id for job_id, job in self.jobs.items() if job.finished][:max(excess, 0)]
+        for job_id in evicted:
+            job = self.jobs.pop(job_id)
+            if job.idempotency_key:
+                self.by_key.pop(job.idempotency_key, None)
+        return [os.path.join(self.spool_dir, job_id) for job_id in evicted]
+
+    def stats(self) -> dict:
+        states = {}
+        for job in self.jobs.values():
+            for task in job.files:
+                states[task.status] = states.get(task.status, 0) + 1
+        return {
+            "jobs": len(self.jobs),
+            "queued_files": self.queue.qsize() if self.queue else 0,
+            "workers": self.workers,
+            "maxsize": self.maxsize,
+            "files": states,
+        }
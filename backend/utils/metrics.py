@@ -0,0 +1,145 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+Recording is a dict lookup plus a bisect under a lock, cheap enough to leave on in production.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# Seconds; covers sub-millisecond broker hops up to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in items]
+
+class Collected(_Metric):
+    """
+    Metric whose samples are read from a callback at scrape time: () -> {label values tuple: value}.
+    Used to export state that is already tracked elsewhere (queue depths, cache counters) at zero hot-path cost.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, labels: tuple = (), collect: Callable[[], dict] = None):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        try:
+            samples = self.collect() if self.collect else {}
+        except Exception:
+            samples = {}
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in samples.items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {} # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def collected(self, name: str, help: str, kind: str = "gauge", labels: tuple = (), collect: Callable[[], dict] = None) -> Collected:
+        return self.register(Collected(name, help, kind, labels, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Broker / agents
+BROKER_MESSAGES = registry.counter("rag_broker_messages_total", "MCP messages routed by the broker.", ("type",))
+BROKER_ENQUEUE_SECONDS = registry.histogram("rag_broker_enqueue_seconds", "Time send() spent enqueueing, including backpressure waits.", ("agent",))
+QUEUE_WAIT_SECONDS = registry.histogram("rag_queue_wait_seconds", "Time from message creation until an agent starts handling it.", ("agent",))
+AGENT_HANDLE_SECONDS = registry.histogram("rag_agent_handle_seconds", "Time an agent spends handling one message.", ("agent", "task"))
+AGENT_ERRORS = registry.counter("rag_agent_errors_total", "Messages whose handler raised.", ("agent",))
+
+# Pipeline stages: parse, query_embed, vector_search, lexical_search, context, ingest_embed, ingest_write, llm, llm_first_token
+STAGE_SECONDS = registry.histogram("rag_stage_seconds", "Duration of individual pipeline stages.", ("stage",))
+CHUNKS_INDEXED = registry.counter("rag_chunks_indexed_total", "Chunks written to the vector store (rate() gives chunks per second).")
+CHUNKS_SKIPPED = registry.counter("rag_chunks_skipped_total", "Chunks already indexed and skipped on upload.")
+RETRIEVAL_BATCH_SIZE = registry.histogram("rag_retrieval_batch_size", "Queries per micro-batched vector search.", buckets=(1, 2, 4, 8, 16, 32, 64))
+RETRIEVAL_PATH = registry.counter("rag_retrieval_path_total", "Retrievals by path: dense, hybrid or the lexical fast path.", ("path",))
+CONTEXT_TOKENS = registry.histogram("rag_context_tokens", "Tokens in the assembled context sent to the LLM.", buckets=(64, 128, 256, 512, 1024, 2048, 4096))
+LLM_TOKENS = registry.counter("rag_llm_stream_chunks_total", "Token deltas streamed from the LLM.")
+LLM_RETRIES = registry.counter("rag_llm_retries_total", "LLM calls retried, by HTTP status (or connection).", ("reason",))
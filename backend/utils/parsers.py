@@ -0,0 +1,114 @@
+"""
+Document text extraction.
+Kept free of agent/broker imports so it can run in the parse process pool.
+
+Documents are read a window at a time: extract_window returns the text units
+(pages, slides, paragraphs, blocks of lines, table rows) starting at `cursor` plus
+the cursor to resume from, or None once the document is exhausted. Only the current
+window is ever held in memory or shipped back from the worker process.
+
+Tabular files (see is_tabular) come back one unit per record, header first, so the
+ingestion can group whole rows into chunks instead of cutting them mid-row.
+
+Each format has a handler in PARSERS, registered by extension. Handlers import their
+parsing library (pypdf, python-docx, python-pptx) on first use, so importing this
+module stays cheap and a process that never sees a PDF never loads pypdf.
+"""
+import os
+from typing import Callable, Optional
+
+# extension -> handler(file_path, cursor, window_pages, window_bytes) -> (units, next cursor)
+PARSERS: dict[str, Callable[[str, int, int, int], tuple[list[str], Optional[int]]]] = {}
+
+TABULAR_EXTENSIONS = (".csv",)
+
+def parser(*extensions: str):
+    """Registers the decorated function as the handler for `extensions`."""
+    def register(handler):
+        for ext in extensions:
+            PARSERS[ext] = handler
+        return handler
+    return register
+
+def is_tabular(file_name: str) -> bool:
+    return os.path.splitext(file_name)[1].lower() in TABULAR_EXTENSIONS
+
+def read_record(f) -> bytes:
+    """Reads one CSV record from a binary file: a line, extended while a quoted field spans line breaks."""
+    record = f.readline()
+    while record.count(b'"') % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+    return record
+
+def extract_window(file_path: str, file_name: str, cursor: int = 0,
+                   window_pages: int = 16, window_bytes: int = 1024 * 1024) -> tuple[list[str], Optional[int]]:
+    ext = os.path.splitext(file_name)[1].lower()
+    handler = PARSERS.get(ext)
+    if handler is None:
+        raise ValueError(f"Unsupported file format: {ext}")
+    return handler(file_path, cursor, window_pages, window_bytes)
+
+@parser(".pdf")
+def _pdf_window(file_path: str, cursor: int, window_pages: int, window_bytes: int):
+    from pypdf import PdfReader
+    # cursor is a page index; pypdf only parses the pages we touch
+    reader = PdfReader(file_path)
+    total = len(reader.pages)
+    stop = min(cursor + window_pages, total)
+    units = [(reader.pages[i].extract_text() or "") + "\n" for i in range(cursor, stop)]
+    return units, (stop if stop < total else None)
+
+@parser(".txt", ".md")
+def _text_window(file_path: str, cursor: int, window_pages: int, window_bytes: int):
+    # cursor is a byte offset; windows always end on a line break so UTF-8 sequences are never split
+    with open(file_path, "rb") as f:
+        f.seek(cursor)
+        data = f.read(window_bytes)
+        if not data:
+            return [], None
+        data += f.readline()
+        next_cursor = f.tell()
+        at_end = not f.read(1)
+    return [data.decode("utf-8").replace("\r\n", "\n")], (None if at_end else next_cursor)
+
+@parser(".docx")
+def _docx_window(file_path: str, cursor: int, window_pages: int, window_bytes: int):
+    from docx import Document
+    # python-docx always loads the whole document, so it comes back as a single window
+    doc = Document(file_path)
+    return [para.text + "\n" for para in doc.paragraphs], None
+
+@parser(*TABULAR_EXTENSIONS)
+def _csv_window(file_path: str, cursor: int, window_pages: int, window_bytes: int):
+    # cursor is a byte offset at a record boundary; the header is the first unit of the first window
+    with open(file_path, "rb") as f:
+        f.seek(cursor)
+        units = []
+        consumed = 0
+        while consumed < window_bytes:
+            record = read_record(f)
+            if not record:
+                break
+            consumed += len(record)
+            if cursor == 0 and not units:
+                record = record.removeprefix(b"\xef\xbb\xbf")
+            row = record.decode("utf-8").rstrip("\r\n")
+            if row.strip():
+                units.append(row)
+        next_cursor = f.tell()
+        at_end = not f.read(1)
+    return units, (None if at_end else next_cursor)
+
+@parser(".pptx")
+def _pptx_window(file_path: str, cursor: int, window_pages: int, window_bytes: int):
+    from pptx import Presentation
+    prs = Presentation(file_path)
+    units = []
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                units.append(shape.text + "\n")
+    return units, None
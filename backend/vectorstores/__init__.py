@@ -0,0 +1,2 @@
+# Vector store package
+from .base import VectorStore, QueryResult, matches, get_vector_store, vector_store_path
@@ -0,0 +1,98 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+from .. import config
+
+# Chroma's query layout: one list per query embedding under each key
+QueryResult = dict[str, list[list]]
+
+
+def matches(metadata: dict, where: Optional[dict]) -> bool:
+    """
+    Metadata filter in Chroma's syntax: every key in `where` must match, either a value
+    (equality) or {"$in": [values]}.
+    """
+    return not where or all(_match(metadata.get(key), condition) for key, condition in where.items())
+
+
+def _match(value, condition) -> bool:
+    if isinstance(condition, dict):
+        if "$in" in condition:
+            return value in condition["$in"]
+        raise ValueError(f"Unsupported filter operator: {condition}")
+    return value == condition
+
+
+class VectorStore(ABC):
+    """
+    Vector index used by the RetrievalAgent. Embeddings are always computed by the caller.
+    Every method is blocking; call them from the thread pool.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def add(self, ids: list[str], embeddings: list[list[float]], documents: list[str], metadatas: list[dict]):
+        """Adds rows; an id that is already present is replaced."""
+
+    @abstractmethod
+    def query(self, embeddings: list[list[float]], n_results: int, where: dict = None,
+              include_embeddings: bool = False) -> QueryResult:
+        """
+        Nearest neighbours of each embedding: {"ids", "documents", "metadatas", "distances"}, one list
+        per query, plus the hits' stored vectors under "embeddings" when include_embeddings is set.
+        """
+
+    @abstractmethod
+    def get(self, ids: list[str], include_embeddings: bool = False) -> dict[str, list]:
+        """Stored rows by id: {"ids", "documents", "metadatas"} (+ "embeddings"); unknown ids are left out."""
+
+    @abstractmethod
+    def scan(self, batch_size: int = 1000) -> Iterator[dict[str, list]]:
+        """Every stored row, in batches shaped like get()."""
+
+    @abstractmethod
+    def select(self, where: dict) -> dict[str, list]:
+        """Stored rows matching a metadata filter, shaped like get()."""
+
+    @abstractmethod
+    def delete(self, ids: list[str] = None, where: dict = None) -> int:
+        """Deletes rows by id and/or metadata filter and returns how many were removed."""
+
+    @abstractmethod
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """The subset of `ids` that is already stored."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored rows."""
+
+    def persist(self):
+        """Flushes pending state to disk. No-op for stores that write through."""
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "count": self.count()}
+
+
+def vector_store_path(name: str = None) -> str:
+    name = (name or config.VECTOR_BACKEND).lower()
+    return config.VECTOR_PATH if name == "numpy" else config.CHROMA_PATH
+
+
+def get_vector_store(name: str = None) -> VectorStore:
+    name = (name or config.VECTOR_BACKEND).lower()
+    if name == "chroma":
+        from .chroma import ChromaVectorStore
+        return ChromaVectorStore(config.CHROMA_PATH, config.COLLECTION_NAME)
+    if name == "numpy":
+        from .numpy_store import NumpyVectorStore
+        return NumpyVectorStore(
+            config.VECTOR_PATH,
+            dtype=config.VECTOR_DTYPE,
+            index=config.VECTOR_INDEX,
+            nlist=config.IVF_NLIST,
+            nprobe=config.IVF_NPROBE,
+            ivf_min_vectors=config.IVF_MIN_VECTORS,
+            quantization=config.VECTOR_QUANTIZATION,
+            rescore=config.VECTOR_RESCORE,
+        )
+    raise ValueError(f"Unknown vector backend: {name}")
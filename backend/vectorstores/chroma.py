@@ -0,0 +1,68 @@
+from .base import VectorStore, QueryResult
+
+
+def chroma_where(where: dict = None):
+    """Our filters use Chroma's operators already; Chroma only wants several keys wrapped in $and."""
+    if not where:
+        return None
+    if len(where) == 1:
+        return where
+    return {"$and": [{key: condition} for key, condition in where.items()]}
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB persistent collection (HNSW, L2 distance). Metadata filters are applied by Chroma before the search."""
+
+    name = "chroma"
+
+    def __init__(self, path: str, collection_name: str):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=path)
+        # Embeddings are passed in explicitly, so the collection needs no embedding function
+        self.collection = self.client.get_or_create_collection(name=collection_name, embedding_function=None)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, embeddings, n_results, where=None, include_embeddings=False) -> QueryResult:
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            where=chroma_where(where),
+            include=include
+        )
+        empty = [[] for _ in embeddings]
+        return {key: results[key] if results[key] is not None and len(results[key]) else empty for key in ["ids"] + include}
+
+    def get(self, ids, include_embeddings=False) -> dict[str, list]:
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = self.collection.get(ids=list(ids), include=include)
+        return {key: results[key] if results[key] is not None else [] for key in ["ids"] + include}
+
+    def scan(self, batch_size=1000):
+        offset = 0
+        while True:
+            results = self.collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            if not results["ids"]:
+                return
+            yield {"ids": results["ids"], "documents": results["documents"], "metadatas": results["metadatas"]}
+            if len(results["ids"]) < batch_size:
+                return
+            offset += batch_size
+
+    def select(self, where) -> dict[str, list]:
+        results = self.collection.get(where=chroma_where(where), include=["documents", "metadatas"])
+        return {"ids": results["ids"], "documents": results["documents"], "metadatas": results["metadatas"]}
+
+    def delete(self, ids=None, where=None) -> int:
+        found = self.collection.get(ids=ids, where=chroma_where(where), include=[])["ids"]
+        if found:
+            self.collection.delete(ids=found)
+        return len(found)
+
+    def existing_ids(self, ids) -> set[str]:
+        return set(self.collection.get(ids=list(ids), include=[])["ids"]) if ids else set()
+
+    def count(self) -> int:
+        return self.collection.count()
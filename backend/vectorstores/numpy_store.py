@@ -0,0 +1,599 @@
+import json
+import logging
+import mmap
+import os
+import threading
+import numpy as np
+from .base import VectorStore, QueryResult, matches
+
+logger = logging.getLogger("vectorstores.numpy")
+
+# Rows scored per matmul, so a float16 or memory-mapped matrix is never materialized whole
+BLOCK_ROWS = 65536
+# int8 blocks are converted to float32 before the matmul; small blocks keep that copy in cache
+QUANTIZED_BLOCK_ROWS = 8192
+# Compact on persist() once this fraction of rows is deleted
+COMPACT_RATIO = 0.25
+# Metadata keys with an inverted index (value -> rows), so filtered queries only touch matching rows
+INDEXED_FIELDS = ("source",)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 scalar quantization with one scale per row: row ~= codes * scale."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    codes = np.rint(matrix / np.where(scales == 0, 1.0, scales)[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty clusters from random points
+        sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Best k columns of each row of `scores` (unsorted), with the matching entries of `rows`."""
+    if scores.shape[1] <= k:
+        return scores, rows
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, part, axis=1), np.take_along_axis(rows, part, axis=1)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process store: unit-normalized vectors in a memory-mapped matrix, records in an append-only log.
+    Search is exact (blocked matmul + argpartition) or, with index="ivf", an inverted-file index over
+    k-means centroids that scans the `nprobe` closest lists. Distances are 1 - cosine similarity.
+    Filters on INDEXED_FIELDS resolve to candidate rows first and only those rows are scored.
+    With quantization="int8", the first pass scores int8 codes (a quarter of the float32 bytes) and
+    the best `rescore` * k candidates per query are re-ranked against the full-precision matrix,
+    which stays on disk and is only paged in for those rows.
+
+    Layout of `path` (files are per generation; compaction writes a new one and swaps the manifest):
+        manifest.json          dim, dtype and current generation
+        vectors-<gen>.bin      row-major (capacity, dim) matrix
+        codes-<gen>.bin        int8 codes of the same rows, and scales-<gen>.bin their float32 scales (int8 only)
+        records-<gen>.jsonl    {"id", "document", "metadata"} per row, {"delete": id} per deletion
+        ivf-<gen>.npz          trained centroids and row assignments
+    """
+
+    name = "numpy"
+
+    def __init__(self, path: str, dtype: str = "float32", index: str = "exact",
+                 nlist: int = 0, nprobe: int = 8, ivf_min_vectors: int = 50000,
+                 quantization: str = "none", rescore: int = 4):
+        if index not in ("exact", "ivf"):
+            raise ValueError(f"Unknown vector index: {index}")
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unknown vector quantization: {quantization}")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_vectors = ivf_min_vectors
+        self.quantization = quantization
+        self.rescore = max(1, rescore)
+        self.lock = threading.RLock()
+
+        self.generation = 0
+        self.dim = None
+        self.vectors = None
+        self.codes = None
+        self.scales = None
+        self.capacity = 0
+        self.size = 0
+        self.ids: list[str] = []
+        self.documents: list[str] = []
+        self.metadatas: list[dict] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.row_of: dict[str, int] = {}
+        self.deleted = 0
+        # Metadata index: field -> value -> live rows
+        self.field_rows: dict[str, dict] = {field: {} for field in INDEXED_FIELDS}
+        # IVF state: centroids, row -> list assignment, and one array of rows per list
+        self.centroids = None
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.lists: list[np.ndarray] = []
+        self.trained_size = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # Files
+
+    def _file(self, kind: str, generation: int = None) -> str:
+        generation = self.generation if generation is None else generation
+        extension = {"vectors": "bin", "codes": "bin", "scales": "bin", "records": "jsonl", "ivf": "npz"}[kind]
+        return os.path.join(self.path, f"{kind}-{generation}.{extension}")
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "generation": self.generation}, f)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def _map(self, capacity: int):
+        """(Re)maps the vector file, growing it to `capacity` rows. Earlier maps stay valid for readers."""
+        file_name = self._file("vectors")
+        with open(file_name, "ab") as f:
+            f.truncate(max(capacity * self.dim * self.dtype.itemsize, os.path.getsize(file_name)))
+        self.capacity = os.path.getsize(file_name) // (self.dim * self.dtype.itemsize)
+        self.vectors = np.memmap(file_name, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dim)) if self.capacity else None
+        if self.quantization == "int8":
+            self.codes = self._map_file("codes", np.int8, (self.capacity, self.dim))
+            self.scales = self._map_file("scales", np.float32, (self.capacity,))
+            # Rescoring reads a few scattered rows; without this the kernel pages in their neighbours too
+            if self.vectors is not None and hasattr(mmap, "MADV_RANDOM"):
+                self.vectors._mmap.madvise(mmap.MADV_RANDOM)
+
+    def _map_file(self, kind: str, dtype, shape: tuple):
+        file_name = self._file(kind)
+        with open(file_name, "ab") as f:
+            f.truncate(max(int(np.prod(shape)) * np.dtype(dtype).itemsize, os.path.getsize(file_name)))
+        return np.memmap(file_name, dtype=dtype, mode="r+", shape=shape) if self.capacity else None
+
+    def _load(self):
+        manifest_file = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_file):
+            return
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        self.dim = manifest["dim"]
+        self.dtype = np.dtype(manifest["dtype"])
+        self.generation = manifest["generation"]
+
+        rows = []
+        # "a+" so a store that crashed before its first add still opens
+        with open(self._file("records"), "a+", encoding="utf-8") as f:
+            f.seek(0)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # Torn write from a crash; the rows after it were never acknowledged
+                record = json.loads(line)
+                if "delete" in record:
+                    if record["delete"] in self.row_of:
+                        rows[self.row_of.pop(record["delete"])] = None
+                else:
+                    self.row_of[record["id"]] = len(rows)
+                    rows.append(record)
+        self.size = len(rows)
+        self.ids = [r["id"] if r else None for r in rows]
+        self.documents = [r["document"] if r else None for r in rows]
+        self.metadatas = [r["metadata"] if r else None for r in rows]
+        self.alive = np.array([r is not None for r in rows], dtype=bool)
+        self.deleted = self.size - len(self.row_of)
+        self._index_rows(0)
+        self._map(self.size)
+        if self.quantization == "int8":
+            self._backfill_codes()
+        if self.index == "ivf":
+            self._load_ivf()
+        logger.info("Loaded %d vectors (dim=%s, %s) from %s", len(self.row_of), self.dim, self.dtype.name, self.path)
+
+    # Writes
+
+    def add(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        matrix = normalize(np.asarray(embeddings, dtype=np.float32))
+        with self.lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._write_manifest()
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match the index ({self.dim})")
+            replaced = [i for i in ids if i in self.row_of]
+            if replaced:
+                self.delete(ids=replaced)
+
+            start, stop = self.size, self.size + len(ids)
+            if stop > self.capacity:
+                self._map(max(stop, 2 * self.capacity, 1024))
+            # Vectors first, then the records that make them visible after a restart
+            self.vectors[start:stop] = matrix
+            self.vectors.flush()
+            if self.codes is not None:
+                self.codes[start:stop], self.scales[start:stop] = quantize(matrix)
+                self.codes.flush()
+                self.scales.flush()
+            with open(self._file("records"), "a", encoding="utf-8") as f:
+                for record_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": record_id, "document": document, "metadata": metadata}) + "\n")
+
+            self.ids.extend(ids)
+            self.documents.extend(documents)
+            self.metadatas.extend(metadatas)
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            for row, record_id in enumerate(ids, start):
+                self.row_of[record_id] = row
+            self.size = stop
+            self._index_rows(start)
+            if self.index == "ivf":
+                self._update_ivf(matrix, start)
+
+    def delete(self, ids=None, where=None) -> int:
+        with self.lock:
+            candidates = self._candidate_rows(where) if where else None
+            if ids is not None:
+                rows = [self.row_of[i] for i in ids if i in self.row_of]
+                if candidates is not None:
+                    rows = [row for row in rows if row in candidates]
+            else:
+                rows = sorted(candidates) if candidates is not None else list(self.row_of.values())
+            if not rows:
+                return 0
+            with open(self._file("records"), "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"delete": self.ids[row]}) + "\n")
+            # Copy, so queries holding the previous mask are unaffected
+            alive = self.alive.copy()
+            alive[rows] = False
+            self.alive = alive
+            for row in rows:
+                del self.row_of[self.ids[row]]
+                self._unindex_row(row)
+            self.deleted += len(rows)
+            return len(rows)
+
+    def persist(self):
+        with self.lock:
+            if self.dim is None:
+                return
+            if self.deleted > COMPACT_RATIO * self.size:
+                self._compact()
+            if self.vectors is not None:
+                self.vectors.flush()
+            if self.codes is not None:
+                self.codes.flush()
+                self.scales.flush()
+            if self.centroids is not None:
+                self._save_ivf()
+
+    def _compact(self):
+        """Rewrites live rows into a new generation and swaps the manifest to it."""
+        keep = np.flatnonzero(self.alive[:self.size])
+        generation = self.generation + 1
+        vectors_file = self._file("vectors", generation)
+        matrix = np.memmap(vectors_file, dtype=self.dtype, mode="w+", shape=(max(len(keep), 1), self.dim))
+        for start in range(0, len(keep), BLOCK_ROWS):
+            block = keep[start:start + BLOCK_ROWS]
+            matrix[start:start + len(block)] = self.vectors[block]
+        matrix.flush()
+        del matrix
+        if self.codes is not None:
+            for kind, source in (("codes", self.codes), ("scales", self.scales)):
+                copy = np.memmap(self._file(kind, generation), dtype=source.dtype, mode="w+", shape=(max(len(keep), 1),) + source.shape[1:])
+                for start in range(0, len(keep), BLOCK_ROWS):
+                    block = keep[start:start + BLOCK_ROWS]
+                    copy[start:start + len(block)] = source[block]
+                copy.flush()
+                del copy
+        with open(self._file("records", generation), "w", encoding="utf-8") as f:
+            for row in keep:
+                f.write(json.dumps({"id": self.ids[row], "document": self.documents[row], "metadata": self.metadatas[row]}) + "\n")
+
+        old_generation = self.generation
+        self.generation = generation
+        self._write_manifest()
+        for kind in ("vectors", "codes", "scales", "records", "ivf"):
+            try:
+                os.remove(self._file(kind, old_generation))
+            except FileNotFoundError:
+                pass
+
+        self.ids = [self.ids[row] for row in keep]
+        self.documents = [self.documents[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self.row_of = {record_id: row for row, record_id in enumerate(self.ids)}
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.size = len(keep)
+        self.deleted = 0
+        self.field_rows = {field: {} for field in INDEXED_FIELDS}
+        self._index_rows(0)
+        self.capacity = 0
+        self._map(self.size)
+        if self.centroids is not None:
+            self.assign = self.assign[keep]
+            self._build_lists()
+        logger.info("Compacted vector store to %d rows (generation %d)", self.size, generation)
+
+    # Quantization
+
+    def _backfill_codes(self):
+        """Encodes rows without codes: all of them when int8 was just enabled, or rows added while it was off."""
+        missing = np.flatnonzero(self.scales[:self.size] == 0) if self.size else np.zeros(0, dtype=np.int64)
+        for start in range(0, len(missing), BLOCK_ROWS):
+            block = missing[start:start + BLOCK_ROWS]
+            self.codes[block], self.scales[block] = quantize(np.asarray(self.vectors[block], dtype=np.float32))
+        if len(missing):
+            self.codes.flush()
+            self.scales.flush()
+            logger.info("Quantized %d vectors to int8", len(missing))
+
+    @staticmethod
+    def _rescore(vectors, queries, scores, rows, k):
+        """Re-ranks each query's first-pass candidates by their full-precision scores."""
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for q, (query, query_scores, query_rows) in enumerate(zip(queries, scores, rows)):
+            candidates = np.sort(query_rows[np.isfinite(query_scores)])
+            if len(candidates) == 0:
+                continue
+            exact = np.asarray(vectors[candidates], dtype=np.float32) @ query
+            exact, kept = top_k(exact[None, :], candidates[None, :], k)
+            best_scores[q, :exact.shape[1]] = exact[0]
+            best_rows[q, :kept.shape[1]] = kept[0]
+        return best_scores, best_rows
+
+    # Metadata index
+
+    def _index_rows(self, start: int):
+        for row in range(start, self.size):
+            metadata = self.metadatas[row]
+            if metadata is None:
+                continue
+            for field, values in self.field_rows.items():
+                if field in metadata:
+                    values.setdefault(metadata[field], set()).add(row)
+
+    def _unindex_row(self, row: int):
+        metadata = self.metadatas[row]
+        for field, values in self.field_rows.items():
+            rows = values.get(metadata.get(field)) if field in metadata else None
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del values[metadata[field]]
+
+    def _candidate_rows(self, where: dict) -> set[int]:
+        """Live rows matching `where`: indexed keys intersect their row sets, the rest are checked per candidate."""
+        candidates = None
+        rest = {}
+        for key, condition in where.items():
+            if key not in self.field_rows:
+                rest[key] = condition
+                continue
+            if isinstance(condition, dict):
+                if "$in" not in condition:
+                    raise ValueError(f"Unsupported filter operator: {condition}")
+                values = condition["$in"]
+            else:
+                values = [condition]
+            rows = set().union(*(self.field_rows[key].get(value, ()) for value in values))
+            candidates = rows if candidates is None else candidates & rows
+        if candidates is None:
+            candidates = set(self.row_of.values())
+        if rest:
+            candidates = {row for row in candidates if matches(self.metadatas[row], rest)}
+        return candidates
+
+    # IVF
+
+    def _assign_rows(self, start: int, stop: int) -> np.ndarray:
+        parts = [
+            np.argmax(np.asarray(self.vectors[i:min(i + BLOCK_ROWS, stop)], dtype=np.float32) @ self.centroids.T, axis=1)
+            for i in range(start, stop, BLOCK_ROWS)
+        ]
+        return np.concatenate(parts).astype(np.int32) if parts else np.zeros(0, dtype=np.int32)
+
+    def _build_lists(self):
+        order = np.argsort(self.assign, kind="stable")
+        bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    def _train(self):
+        live = np.flatnonzero(self.alive[:self.size])
+        nlist = min(self.nlist or max(16, int(np.sqrt(len(live)))), len(live))
+        sample = np.random.default_rng(0).choice(live, min(len(live), nlist * 64), replace=False)
+        sample.sort()
+        self.centroids = kmeans(np.asarray(self.vectors[sample], dtype=np.float32), nlist)
+        self.assign = self._assign_rows(0, self.size)
+        self._build_lists()
+        self.trained_size = self.size
+        logger.info("Trained IVF index: %d lists over %d vectors", nlist, self.size)
+
+    def _update_ivf(self, matrix: np.ndarray, start: int):
+        # The size threshold only decides when to train: once trained, every new row must be assigned,
+        # even if deletions and compaction shrank the index below it
+        if self.centroids is None:
+            if self.size >= self.ivf_min_vectors:
+                self._train()
+            return
+        # Retrain as the corpus doubles, so lists stay balanced
+        if self.size >= max(2 * self.trained_size, self.ivf_min_vectors):
+            self._train()
+            return
+        assign = np.argmax(matrix @ self.centroids.T, axis=1).astype(np.int32)
+        self.assign = np.concatenate([self.assign, assign])
+        # New arrays, never in-place appends: concurrent queries keep using the old lists
+        lists = list(self.lists)
+        for c in np.unique(assign):
+            lists[c] = np.concatenate([lists[c], start + np.flatnonzero(assign == c)])
+        self.lists = lists
+
+    def _save_ivf(self):
+        np.savez(self._file("ivf"), centroids=self.centroids, assign=self.assign, trained_size=self.trained_size)
+
+    def _load_ivf(self):
+        try:
+            saved = np.load(self._file("ivf"))
+        except FileNotFoundError:
+            if self.size >= self.ivf_min_vectors:
+                self._train()
+            return
+        self.centroids = saved["centroids"]
+        self.trained_size = int(saved["trained_size"])
+        # Rows added after the last persist() are assigned now
+        assign = saved["assign"][:self.size]
+        self.assign = np.concatenate([assign, self._assign_rows(len(assign), self.size)])
+        self._build_lists()
+
+    # Reads
+
+    def query(self, embeddings, n_results, where=None, include_embeddings=False) -> QueryResult:
+        queries = normalize(np.asarray(embeddings, dtype=np.float32))
+        with self.lock:
+            # Snapshot; writers replace these objects instead of mutating them
+            size, vectors, alive, deleted = self.size, self.vectors, self.alive, self.deleted
+            codes, scales = self.codes, self.scales
+            ids, documents, metadatas = self.ids, self.documents, self.metadatas
+            centroids, lists = self.centroids, self.lists
+            candidates = np.fromiter(sorted(self._candidate_rows(where)), dtype=np.int64) if where else None
+        mask = alive[:size] if deleted else None
+        # First pass over the int8 codes for a wider pool, then exact scores for that pool only
+        matrix, k = (codes, n_results * self.rescore) if codes is not None else (vectors, n_results)
+
+        if size == 0 or n_results <= 0:
+            scores = np.zeros((len(queries), 0), dtype=np.float32)
+            rows = np.zeros((len(queries), 0), dtype=np.int64)
+        elif candidates is not None:
+            scores, rows = self._search_rows(matrix, scales, candidates, queries, k)
+        elif centroids is not None:
+            scores, rows = self._search_ivf(matrix, scales, centroids, lists, queries, k, mask)
+        else:
+            scores, rows = self._search_exact(matrix, scales, size, queries, k, mask)
+        if codes is not None and size and n_results > 0:
+            scores, rows = self._rescore(vectors, queries, scores, rows, n_results)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if include_embeddings:
+            result["embeddings"] = []
+        for query_scores, query_rows in zip(scores, rows):
+            order = np.argsort(-query_scores, kind="stable")
+            hits = [(float(query_scores[i]), int(query_rows[i])) for i in order if np.isfinite(query_scores[i])]
+            result["ids"].append([ids[row] for _, row in hits])
+            result["documents"].append([documents[row] for _, row in hits])
+            result["metadatas"].append([metadatas[row] for _, row in hits])
+            result["distances"].append([1.0 - score for score, _ in hits])
+            if include_embeddings:
+                # Unit-normalized rows of the full-precision matrix (not the int8 codes); no matrix before the first add
+                result["embeddings"].append(
+                    list(np.asarray(vectors[[row for _, row in hits]], dtype=np.float32)) if hits and vectors is not None else []
+                )
+        return result
+
+    @staticmethod
+    def _scores(queries, matrix, scales, rows):
+        """Scores of `rows` (a slice or an index array) of the float or int8 matrix."""
+        scores = queries @ np.asarray(matrix[rows], dtype=np.float32).T
+        if scales is not None:
+            scores *= scales[rows]
+        return scores
+
+    def _search_exact(self, matrix, scales, size, queries, k, mask):
+        """Blocked brute force: keeps the running top-k per query across blocks."""
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        block_rows = BLOCK_ROWS if scales is None else QUANTIZED_BLOCK_ROWS
+        for start in range(0, size, block_rows):
+            stop = min(start + block_rows, size)
+            scores = self._scores(queries, matrix, scales, slice(start, stop))
+            if mask is not None:
+                scores[:, ~mask[start:stop]] = -np.inf
+            rows = np.broadcast_to(np.arange(start, stop), scores.shape)
+            best_scores, best_rows = top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_rows, rows], axis=1),
+                k
+            )
+        return best_scores, best_rows
+
+    def _search_rows(self, matrix, scales, candidates, queries, k):
+        """Brute force over a filtered slice: gathers only the candidate rows, block by block."""
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        block_rows = BLOCK_ROWS if scales is None else QUANTIZED_BLOCK_ROWS
+        for start in range(0, len(candidates), block_rows):
+            block = candidates[start:start + block_rows]
+            scores = self._scores(queries, matrix, scales, block)
+            best_scores, best_rows = top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_rows, np.broadcast_to(block, scores.shape)], axis=1),
+                k
+            )
+        return best_scores, best_rows
+
+    def _search_ivf(self, matrix, scales, centroids, lists, queries, k, mask):
+        nprobe = min(self.nprobe, len(centroids))
+        probes = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for q, (query, probe) in enumerate(zip(queries, probes)):
+            candidates = np.sort(np.concatenate([lists[c] for c in probe]))
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+            if len(candidates) == 0:
+                continue
+            scores = self._scores(query[None, :], matrix, scales, candidates)
+            scores, rows = top_k(scores, candidates[None, :], k)
+            all_scores[q, :scores.shape[1]] = scores[0]
+            all_rows[q, :rows.shape[1]] = rows[0]
+        return all_scores, all_rows
+
+    def get(self, ids, include_embeddings=False) -> dict[str, list]:
+        with self.lock:
+            rows = [self.row_of[i] for i in ids if i in self.row_of]
+            result = {
+                "ids": [self.ids[row] for row in rows],
+                "documents": [self.documents[row] for row in rows],
+                "metadatas": [self.metadatas[row] for row in rows],
+            }
+            if include_embeddings:
+                result["embeddings"] = list(np.asarray(self.vectors[rows], dtype=np.float32)) if rows else []
+            return result
+
+    def select(self, where) -> dict[str, list]:
+        with self.lock:
+            rows = sorted(self._candidate_rows(where))
+            return {
+                "ids": [self.ids[row] for row in rows],
+                "documents": [self.documents[row] for row in rows],
+                "metadatas": [self.metadatas[row] for row in rows],
+            }
+
+    def scan(self, batch_size=1000):
+        with self.lock:
+            ids = list(self.row_of)
+        for start in range(0, len(ids), batch_size):
+            yield self.get(ids[start:start + batch_size])
+
+    def existing_ids(self, ids) -> set[str]:
+        with self.lock:
+            return {i for i in ids if i in self.row_of}
+
+    def count(self) -> int:
+        return len(self.row_of)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "backend": self.name,
+                "count": len(self.row_of),
+                "dim": self.dim,
+                "dtype": self.dtype.name,
+                "index": self.index,
+                "ivf_lists": len(self.centroids) if self.centroids is not None else 0,
+                "deleted_rows": self.deleted,
+                "indexed_fields": {field: len(values) for field, values in self.field_rows.items()},
+                "matrix_bytes": self.capacity * (self.dim or 0) * self.dtype.itemsize,
+                "quantization": self.quantization,
+                # What a full first pass reads: the int8 codes and scales, or the matrix itself
+                "search_bytes": self.capacity * ((self.dim or 0) + 4) if self.codes is not None
+                else self.capacity * (self.dim or 0) * self.dtype.itemsize,
+            }
@@ -0,0 +1,68 @@
+"""
+Agent process for multi-process deployments (RAG_ROLE in config.py):
+
+    RAG_ROLE=retrieval python -m backend.worker        # RetrievalAgent, JobAgent + message hub; start it first
+    RAG_ROLE=ingestion python -m backend.worker        # one IngestionAgent; run as many as wanted
+    RAG_ROLE=api uvicorn backend.main:app --workers 4  # API workers
+
+All processes must agree on BROKER_SOCKET and UPLOAD_DIR. The retrieval process is the only one that
+opens the vector store and loads the embedding model, and the only one that keeps ingestion jobs.
+"""
+import asyncio
+import logging
+import signal
+
+from . import config
+from .mcp.broker import broker
+from .mcp.transport import Hub
+from .utils.executors import executors
+
+logging.basicConfig(level=config.LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+
+async def run():
+    role = config.RAG_ROLE
+    hub = None
+    retrieval = None
+    jobs = None
+    if role == "retrieval":
+        from .agents.jobs import JobAgent
+        from .agents.retrieval import RetrievalAgent, reset_index
+        reset_index()
+        hub = Hub(config.BROKER_SOCKET)
+        await hub.start()
+        retrieval = RetrievalAgent()
+        # A single process, so every API worker sees the same jobs
+        jobs = JobAgent()
+    elif role == "ingestion":
+        from .agents.ingestion import IngestionAgent
+        IngestionAgent()
+    else:
+        raise SystemExit(f"RAG_ROLE must be 'retrieval' or 'ingestion' for a worker process, not '{role}'")
+
+    print(f"Starting {role} worker (hub: {config.BROKER_SOCKET})...", flush=True)
+    await broker.start()
+    await broker.connect(config.BROKER_SOCKET)
+    warmup = asyncio.create_task(retrieval.warm_up()) if retrieval is not None else None
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    print(f"Shutting down {role} worker...", flush=True)
+    if warmup is not None:
+        warmup.cancel()
+    if jobs is not None:
+        await jobs.stop()
+    await broker.shutdown()
+    if retrieval is not None:
+        await executors.run_io(retrieval.close)
+    if hub is not None:
+        await hub.stop()
+    executors.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
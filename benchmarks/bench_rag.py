@@ -0,0 +1,288 @@
+"""
+Offline load-test and benchmark harness.
+
+Starts the API in a subprocess with the fake LLM (or targets a running server with --url),
+then runs the selected scenarios and writes the results as JSON so runs can be diffed
+across commits:
+
+    python -m benchmarks.bench_rag --sizes small medium --concurrency 16 --requests 200
+    python -m benchmarks.bench_rag --scenarios chat stream --url http://127.0.0.1:8000
+
+Scenarios:
+    cold_start  time until the server accepts connections and until /ready is 200
+    ingest      per-file upload time, MB/s and chunks/s for every corpus file
+    chat        concurrent /chat load: p50/p95/p99 latency and requests per second
+    stream      concurrent /chat/stream load: time to first token and total latency
+    mixed       chat load while new documents the size of the largest corpus files are being uploaded
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .corpus import FORMATS, SIZES, generate, sample_queries
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("cold_start", "ingest", "chat", "stream", "mixed")
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def git_revision() -> dict:
+    def run(*cmd):
+        try:
+            return subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return ""
+    return {"commit": run("git", "rev-parse", "--short", "HEAD"), "dirty": bool(run("git", "status", "--porcelain", "--untracked-files=no"))}
+
+async def start_server(args, workdir: str):
+    """Launches uvicorn with an isolated index and cache; returns (process, base_url, cold start timings)."""
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": "groq" if args.real_llm else "fake",
+        "FAKE_LLM_TOKEN_DELAY": str(args.token_delay),
+        "CHROMA_PATH": os.path.join(workdir, "chroma_db"),
+        "VECTOR_PATH": os.path.join(workdir, "vector_index"),
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "EMBED_CACHE_PATH": "" if args.no_embed_cache else os.path.join(workdir, "embedding_cache.sqlite3"),
+        "PERSIST_INDEX": "0",
+        "LOG_LEVEL": "WARNING",
+    })
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    listening = ready = None
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.perf_counter() - start < args.startup_timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited during startup with code {process.returncode}")
+            try:
+                response = await client.get("/ready")
+                listening = listening or time.perf_counter() - start
+                if response.status_code == 200:
+                    ready = time.perf_counter() - start
+                    break
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    if ready is None:
+        process.terminate()
+        raise RuntimeError("Server did not become ready in time")
+    return process, base_url, {"time_to_listening_s": round(listening, 3), "time_to_ready_s": round(ready, 3)}
+
+async def upload(client: httpx.AsyncClient, info: dict) -> dict:
+    """Uploads one corpus file, under info["name"] if given (default: its file name)."""
+    name = info.get("name") or os.path.basename(info["path"])
+    start = time.perf_counter()
+    with open(info["path"], "rb") as f:
+        response = await client.post("/upload", files={"file": (name, f)})
+    elapsed = time.perf_counter() - start
+    result = response.json().get("result", {}) if response.status_code == 200 else {}
+    chunks = result.get("chunks_count", 0)
+    return {
+        "file": name,
+        "format": info["format"],
+        "size": info["size"],
+        "mb": round(info["bytes"] / 1e6, 3),
+        "seconds": round(elapsed, 3),
+        "mb_per_s": round(info["bytes"] / 1e6 / elapsed, 3),
+        "chunks": chunks,
+        "chunks_per_s": round(chunks / elapsed, 1),
+        "error": result.get("error") or (None if response.status_code == 200 else response.text),
+    }
+
+async def run_ingest(client: httpx.AsyncClient, files: list[dict]) -> dict:
+    runs = [await upload(client, info) for info in files]
+    total_mb = sum(r["mb"] for r in runs)
+    total_s = sum(r["seconds"] for r in runs)
+    return {
+        "files": runs,
+        "total_mb_per_s": round(total_mb / total_s, 3) if total_s else 0.0,
+        "total_chunks_per_s": round(sum(r["chunks"] for r in runs) / total_s, 1) if total_s else 0.0,
+    }
+
+async def run_chat(client: httpx.AsyncClient, queries: list[str], concurrency: int, stop: asyncio.Event = None) -> dict:
+    """Runs every query (or until `stop` is set) with `concurrency` parallel clients."""
+    latencies, errors = [], 0
+    pending = iter(queries)
+
+    async def worker():
+        nonlocal errors
+        for query in pending:
+            if stop is not None and stop.is_set():
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.post("/chat", json={"query": query})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def run_stream(client: httpx.AsyncClient, queries: list[str], concurrency: int) -> dict:
+    first_tokens, latencies, errors = [], [], 0
+    pending = iter(queries)
+
+    async def worker():
+        nonlocal errors
+        for query in pending:
+            start = time.perf_counter()
+            first = None
+            try:
+                async with client.stream("POST", "/chat/stream", json={"query": query}) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if first is None and line == "event: token":
+                            first = time.perf_counter() - start
+                        elif line == "event: error":
+                            raise httpx.HTTPError("stream error")
+                latencies.append(time.perf_counter() - start)
+                if first is not None:
+                    first_tokens.append(first)
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, errors, time.perf_counter() - start)
+    summary.update({
+        "ttft_p50_ms": round(percentile(first_tokens, 50) * 1000, 1),
+        "ttft_p95_ms": round(percentile(first_tokens, 95) * 1000, 1),
+        "ttft_p99_ms": round(percentile(first_tokens, 99) * 1000, 1),
+    })
+    return summary
+
+async def run_mixed(client: httpx.AsyncClient, files: list[dict], queries: list[str], concurrency: int) -> dict:
+    """Chat load for as long as the uploads take (but at most the query list)."""
+    stop = asyncio.Event()
+
+    async def ingest():
+        try:
+            return await asyncio.gather(*(upload(client, info) for info in files))
+        finally:
+            stop.set()
+
+    uploads, chat = await asyncio.gather(ingest(), run_chat(client, queries, concurrency, stop))
+    return {"chat": chat, "uploads": list(uploads)}
+
+async def stage_means(client: httpx.AsyncClient) -> dict:
+    """Mean duration per pipeline stage, read from the server's /metrics."""
+    try:
+        text = (await client.get("/metrics")).text
+    except httpx.HTTPError:
+        return {}
+    sums, counts = {}, {}
+    for line in text.splitlines():
+        if line.startswith("rag_stage_seconds_sum") or line.startswith("rag_stage_seconds_count"):
+            name, value = line.rsplit(" ", 1)
+            stage = name.split('stage="', 1)[1].split('"', 1)[0]
+            (sums if "_sum" in name else counts)[stage] = float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000, 2) for stage in sums if counts.get(stage)}
+
+async def main(args):
+    files = generate(args.corpus, args.sizes, args.formats)
+    # The mixed scenario needs documents the server has not seen: re-uploading the ingest scenario's
+    # files would be an "unchanged" no-op and put no ingestion load on the server
+    largest_size = max(args.sizes, key=lambda s: SIZES[s])
+    largest = [{**info, "name": f"mixed-{os.path.basename(info['path'])}"}
+               for info in generate(os.path.join(args.corpus, "mixed"), [largest_size], args.formats, seed=43)] if "mixed" in args.scenarios else []
+    results = {
+        "meta": {
+            **git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        process = None
+        base_url = args.url
+        if base_url is None:
+            process, base_url, cold = await start_server(args, workdir)
+            if "cold_start" in args.scenarios:
+                results["scenarios"]["cold_start"] = cold
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+            async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+                if "ingest" in args.scenarios:
+                    results["scenarios"]["ingest"] = await run_ingest(client, files)
+                if "chat" in args.scenarios:
+                    results["scenarios"]["chat"] = await run_chat(client, sample_queries(args.requests, seed=1), args.concurrency)
+                if "stream" in args.scenarios:
+                    results["scenarios"]["stream"] = await run_stream(client, sample_queries(args.requests, seed=2), args.concurrency)
+                if "mixed" in args.scenarios:
+                    results["scenarios"]["mixed"] = await run_mixed(client, largest, sample_queries(args.requests * 10, seed=3), args.concurrency)
+                results["stage_means_ms"] = await stage_means(client)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    output = args.output or os.path.join("bench_results", f"{results['meta']['commit'] or 'unknown'}-{int(time.time())}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["scenarios"], indent=2))
+    print(f"Results written to {output}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RAG API with a fake LLM and a synthetic corpus.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one (skips cold_start)")
+    parser.add_argument("--corpus", default="bench_corpus", help="Directory for the generated corpus (reused between runs)")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per chat/stream scenario")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between fake LLM tokens")
+    parser.add_argument("--real-llm", action="store_true", help="Use Groq instead of the fake LLM (needs GROQ_API_KEY)")
+    parser.add_argument("--no-embed-cache", action="store_true")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="JSON output path (default: bench_results/<commit>-<time>.json)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
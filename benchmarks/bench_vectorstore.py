@@ -0,0 +1,119 @@
+"""
+Recall / latency benchmark for the vector store backends.
+
+Builds each configured store from the same synthetic clustered embeddings, then reports build
+time, recall@k against exact float32 search, single-query latency percentiles, batched QPS and
+the bytes a search scans (search_bytes: the int8 codes for quantized configs, else the matrix):
+
+    python -m benchmarks.bench_vectorstore --vectors 200000 --dim 384
+    python -m benchmarks.bench_vectorstore --configs exact-f32 ivf-8 chroma
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from backend.vectorstores.numpy_store import NumpyVectorStore, normalize
+from .bench_rag import percentile
+
+CONFIGS = {
+    "exact-f32": {"dtype": "float32", "index": "exact"},
+    "exact-f16": {"dtype": "float16", "index": "exact"},
+    "ivf-4": {"dtype": "float32", "index": "ivf", "nprobe": 4},
+    "ivf-8": {"dtype": "float32", "index": "ivf", "nprobe": 8},
+    "ivf-16": {"dtype": "float32", "index": "ivf", "nprobe": 16},
+    "ivf-32": {"dtype": "float32", "index": "ivf", "nprobe": 32},
+    # int8 first pass; rescore 1 re-ranks only the k int8 hits, so it shows the recall of the codes alone
+    "exact-int8-r1": {"dtype": "float32", "index": "exact", "quantization": "int8", "rescore": 1},
+    "exact-int8": {"dtype": "float32", "index": "exact", "quantization": "int8", "rescore": 4},
+    "exact-int8-r10": {"dtype": "float32", "index": "exact", "quantization": "int8", "rescore": 10},
+    "ivf-8-int8": {"dtype": "float32", "index": "ivf", "nprobe": 8, "quantization": "int8", "rescore": 4},
+    "chroma": None,
+}
+
+def synthetic(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors scattered around random topic centres, roughly like sentence embeddings of a corpus."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    points = centres[rng.integers(0, clusters, count)] + rng.normal(scale=1.0, size=(count, dim)).astype(np.float32)
+    return normalize(points).astype(np.float32)
+
+def build(name: str, path: str, vectors: np.ndarray, batch: int):
+    if name == "chroma":
+        from backend.vectorstores.chroma import ChromaVectorStore
+        store = ChromaVectorStore(path, "bench")
+    else:
+        store = NumpyVectorStore(path, ivf_min_vectors=0, **CONFIGS[name])
+    # A store with nothing in it yet must answer with empty hits, as it does before the first upload
+    empty = store.query(vectors[:1] if name != "chroma" else vectors[:1].tolist(), 1, include_embeddings=True)
+    assert empty["ids"] == [[]] and empty["embeddings"] == [[]], f"{name}: empty store returned {empty}"
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch):
+        block = vectors[i:i + batch]
+        store.add(
+            ids=[str(j) for j in range(i, i + len(block))],
+            embeddings=block if name != "chroma" else block.tolist(),
+            documents=[""] * len(block),
+            metadatas=[{"n": j} for j in range(i, i + len(block))],
+        )
+    store.persist()
+    return store, time.perf_counter() - start
+
+def run(args) -> dict:
+    data = synthetic(args.vectors + args.queries, args.dim, args.clusters, args.seed)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+    results = {}
+    for name in args.configs:
+        with tempfile.TemporaryDirectory(prefix="vs-bench-") as path:
+            try:
+                store, build_s = build(name, path, vectors, args.batch)
+            except ImportError as e:
+                results[name] = {"skipped": str(e)}
+                continue
+
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                hits = store.query([query], args.k)["ids"][0]
+                latencies.append(time.perf_counter() - start)
+                found.append({int(i) for i in hits})
+            recall = float(np.mean([len(f & set(t)) / args.k for f, t in zip(found, truth)]))
+
+            start = time.perf_counter()
+            for i in range(0, len(queries), 16):
+                store.query(queries[i:i + 16], args.k)
+            batch_s = time.perf_counter() - start
+
+            results[name] = {
+                "build_s": round(build_s, 2),
+                f"recall@{args.k}": round(recall, 4),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+                "batch16_qps": round(len(queries) / batch_s, 1),
+                **({"stats": store.stats()} if name != "chroma" else {}),
+            }
+            print(name, json.dumps(results[name]))
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare vector store backends on synthetic embeddings.")
+    parser.add_argument("--configs", nargs="+", default=[c for c in CONFIGS if c != "chroma"], choices=list(CONFIGS))
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the results as JSON")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
@@ -0,0 +1,158 @@
+"""
+Synthetic, reproducible corpus for benchmarks.
+Generates PDF, DOCX, PPTX, CSV and TXT files of a target size from a seeded word list,
+sprinkled with exact-match identifiers (SKU codes) that chat scenarios can ask about.
+
+    python -m benchmarks.corpus --out bench_corpus --sizes small medium
+"""
+import argparse
+import csv
+import os
+import random
+
+WORDS = (
+    "policy employee leave travel expense approval manager budget quarter revenue report "
+    "security access password device laptop network vendor contract invoice payment "
+    "customer support ticket escalation incident review compliance audit training deadline "
+    "project milestone release deployment server database backup retention schedule office"
+).split()
+
+# Approximate amount of text per file
+SIZES = {"small": 50_000, "medium": 1_000_000, "large": 10_000_000}
+FORMATS = ("txt", "csv", "pdf", "docx", "pptx")
+
+def sku(rng: random.Random) -> str:
+    return f"SKU-{rng.randint(10000, 99999)}"
+
+def sentences(rng: random.Random, approx_chars: int):
+    """Yields sentences until roughly approx_chars characters were produced."""
+    produced = 0
+    while produced < approx_chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), sku(rng))
+        sentence = " ".join(words).capitalize() + "."
+        produced += len(sentence) + 1
+        yield sentence
+
+def paragraphs(rng: random.Random, approx_chars: int, per_paragraph: int = 5):
+    batch = []
+    for sentence in sentences(rng, approx_chars):
+        batch.append(sentence)
+        if len(batch) == per_paragraph:
+            yield " ".join(batch)
+            batch = []
+    if batch:
+        yield " ".join(batch)
+
+def write_txt(path: str, rng: random.Random, approx_chars: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for paragraph in paragraphs(rng, approx_chars):
+            f.write(paragraph + "\n\n")
+
+def write_csv(path: str, rng: random.Random, approx_chars: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "sku", "product", "description", "price"])
+        produced, row_id = 0, 0
+        while produced < approx_chars:
+            row = [row_id, sku(rng), " ".join(rng.choice(WORDS) for _ in range(2)).title(),
+                   " ".join(rng.choice(WORDS) for _ in range(12)), f"{rng.uniform(1, 999):.2f}"]
+            writer.writerow(row)
+            produced += sum(len(str(v)) for v in row) + 5
+            row_id += 1
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, rng: random.Random, approx_chars: int, lines_per_page: int = 50, line_chars: int = 90):
+    """Minimal text-only PDF writer (one Helvetica font, no dependencies)."""
+    lines, current = [], ""
+    for sentence in sentences(rng, approx_chars):
+        for word in sentence.split():
+            if len(current) + len(word) + 1 > line_chars:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {len(pages)} >>")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, page in enumerate(pages):
+        content = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in page) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[i] + 1} 0 R >>")
+        objects.append(f"<< /Length {len(content.encode('latin-1'))} >>\nstream\n{content}\nendstream")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+
+def write_docx(path: str, rng: random.Random, approx_chars: int):
+    from docx import Document
+    doc = Document()
+    for paragraph in paragraphs(rng, approx_chars):
+        doc.add_paragraph(paragraph)
+    doc.save(path)
+
+def write_pptx(path: str, rng: random.Random, approx_chars: int):
+    from pptx import Presentation
+    prs = Presentation()
+    layout = prs.slide_layouts[1] # title and content
+    for i, paragraph in enumerate(paragraphs(rng, approx_chars, per_paragraph=3)):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}"
+        slide.placeholders[1].text = paragraph
+    prs.save(path)
+
+WRITERS = {"txt": write_txt, "csv": write_csv, "pdf": write_pdf, "docx": write_docx, "pptx": write_pptx}
+
+def generate(out_dir: str, sizes=("small",), formats=FORMATS, seed: int = 42) -> list[dict]:
+    """Writes one file per (format, size) and returns their descriptions. Existing files are reused."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = []
+    for size in sizes:
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{size}.{fmt}")
+            if not os.path.exists(path):
+                # Seed per file so each file is reproducible on its own
+                rng = random.Random(f"{seed}-{size}-{fmt}")
+                WRITERS[fmt](path, rng, SIZES[size])
+            files.append({"path": path, "format": fmt, "size": size, "bytes": os.path.getsize(path)})
+    return files
+
+def sample_queries(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    templates = [
+        "What does the policy say about {a} and {b}?",
+        "What is the price of {sku}?",
+        "Summarize the {a} {b} requirements.",
+        "Who approves {a} for {b}?",
+    ]
+    return [
+        rng.choice(templates).format(a=rng.choice(WORDS), b=rng.choice(WORDS), sku=sku(rng))
+        for _ in range(count)
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus.")
+    parser.add_argument("--out", default="bench_corpus")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    for info in generate(args.out, args.sizes, args.formats, args.seed):
+        print(f"{info['path']}: {info['bytes'] / 1e6:.2f} MB")
@@ -0,0 +1,80 @@
+"""
+Import-time budget check for the API's cold start.
+
+Imports `backend.main` in a fresh interpreter under `python -X importtime`, reports where
+the time goes and exits non-zero when startup regresses: when the import takes longer than
+--budget-ms (best of --repeat runs), or when a module that should only load on first use
+(document parsers, the LLM SDK, numpy, the model stack) is imported eagerly.
+
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --role api --budget-ms 500 --top 20
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported lazily by design; any of these at import time is a regression
+DEFERRED_MODULES = ("pypdf", "docx", "pptx", "pandas", "groq", "httpx", "numpy",
+                    "chromadb", "sentence_transformers", "torch", "tokenizers")
+
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+
+def measure(module: str, env: dict) -> list[tuple[int, int, str]]:
+    """(self µs, cumulative µs, module) for every import, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), match.group(3)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when importing the API gets slower or loads deferred modules.")
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--role", default="all", help="RAG_ROLE to import under")
+    parser.add_argument("--budget-ms", type=float, default=750.0, help="Maximum import time of --module")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the best of, to filter out noise")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list by self time")
+    parser.add_argument("--allow", nargs="*", default=[], help="Deferred modules to tolerate")
+    args = parser.parse_args()
+
+    env = {**os.environ, "RAG_ROLE": args.role, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))}
+    runs = [measure(args.module, env) for _ in range(args.repeat)]
+    totals = [next((cumulative for _, cumulative, name in rows if name == args.module), 0) for rows in runs]
+    best = min(range(len(runs)), key=lambda i: totals[i])
+    rows, total_ms = runs[best], totals[best] / 1000
+
+    by_package = Counter()
+    for self_us, _, name in rows:
+        by_package[name.split(".")[0]] += self_us
+    print(f"import {args.module} (RAG_ROLE={args.role}): {total_ms:.0f} ms, best of {args.repeat}; budget {args.budget_ms:.0f} ms")
+    for package, self_us in by_package.most_common(args.top):
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    imported = {name.split(".")[0] for _, _, name in rows}
+    eager = sorted(module for module in DEFERRED_MODULES if module in imported and module not in args.allow)
+    failures = []
+    if eager:
+        failures.append(f"deferred modules imported at startup: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Local OpenAI-compatible chat-completions server for exercising the LLM client without Groq.
+
+Streams a canned answer over SSE (or returns it whole), and can inject the failures the client
+has to survive: 429s once more than --max-concurrency requests are in flight, a random share of
+503s, and a tokens-per-minute quota. Point the backend at it with GROQ_BASE_URL:
+
+    python -m benchmarks.mock_llm_server --port 8100 --max-concurrency 4 --error-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8100 GROQ_API_KEY=test LLM_PROVIDER=groq uvicorn backend.main:app
+
+GET /stats reports requests served and rejected, and the peak concurrency observed.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = "This is a canned answer from the mock LLM server, streamed one word at a time."
+
+
+def create_app(token_delay: float = 0.01, latency: float = 0.05, max_concurrency: int = 0,
+               error_rate: float = 0.0, tokens_per_minute: int = 0, retry_after: float = 1.0,
+               seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    rng = random.Random(seed)
+    state = {"in_flight": 0, "peak": 0, "served": 0, "rate_limited": 0, "errors": 0, "window": time.time(), "tokens": 0}
+
+    def usage(prompt: str, words: list[str]) -> dict:
+        prompt_tokens = len(prompt) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None, extra: dict = None) -> str:
+        body = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **(extra or {}),
+        }
+        return f"data: {json.dumps(body)}\n\n"
+
+    def reject(status: int, message: str) -> JSONResponse:
+        headers = {"retry-after": str(retry_after)} if status == 429 else {}
+        return JSONResponse({"error": {"message": message, "type": "mock_error"}}, status_code=status, headers=headers)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        prompt = "".join(m.get("content") or "" for m in body.get("messages", []))
+        words = [w if i == 0 else " " + w for i, w in enumerate(ANSWER.split(" "))]
+        cost = usage(prompt, words)
+
+        if max_concurrency and state["in_flight"] >= max_concurrency:
+            state["rate_limited"] += 1
+            return reject(429, "Too many concurrent requests")
+        if tokens_per_minute:
+            if time.time() - state["window"] >= 60:
+                state["window"], state["tokens"] = time.time(), 0
+            if state["tokens"] + cost["total_tokens"] > tokens_per_minute:
+                state["rate_limited"] += 1
+                return reject(429, "Tokens per minute exceeded")
+            state["tokens"] += cost["total_tokens"]
+        if rng.random() < error_rate:
+            state["errors"] += 1
+            return reject(503, "Service unavailable")
+
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(latency + token_delay * len(words))
+            finally:
+                state["in_flight"] -= 1
+            state["served"] += 1
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}],
+                "usage": cost,
+            }
+
+        async def events():
+            try:
+                await asyncio.sleep(latency)
+                yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+                for word in words:
+                    await asyncio.sleep(token_delay)
+                    yield chunk(completion_id, model, {"content": word})
+                # Groq reports usage on the final chunk under x_groq
+                yield chunk(completion_id, model, {}, "stop", {"x_groq": {"id": completion_id, "usage": cost}})
+                yield "data: [DONE]\n\n"
+                state["served"] += 1
+            finally:
+                state["in_flight"] -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {key: value for key, value in state.items() if key not in ("window", "tokens")}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server with injectable 429s and 503s.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed words")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="Answer 429 beyond this many in-flight requests (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="Answer 429 once this many tokens were used in the current minute")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    app = create_app(args.token_delay, args.latency, args.max_concurrency, args.error_rate,
+                     args.tokens_per_minute, args.retry_after, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
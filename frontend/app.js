@@ -29,7 +29,7 @@ document.addEventListener('DOMContentLoaded', () => {
         showTypingIndicator();
 
         try {
-            const response = await fetch('/chat', {
+            const response = await fetch('/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ query })
@@ -37,11 +37,29 @@ document.addEventListener('DOMContentLoaded', () => {
 
             if (!response.ok) throw new Error('API Error');
 
-            const data = await response.json();
-            removeTypingIndicator();
-
-            addMessage(data.answer, 'bot', data.context);
-            logTrace(data.trace_id, "Completed", "Chat Request");
+            let context = null;
+            let answer = '';
+            let bubble = null;
+
+            await readEventStream(response, (event) => {
+                if (event.type === 'context') {
+                    context = event.context;
+                } else if (event.type === 'token') {
+                    if (!bubble) {
+                        removeTypingIndicator();
+                        bubble = addMessage('', 'bot');
+                    }
+                    answer += event.delta;
+                    setBubbleText(bubble, answer);
+                } else if (event.type === 'done') {
+                    removeTypingIndicator();
+                    if (!bubble) bubble = addMessage(event.answer || '', 'bot');
+                    setBubbleText(bubble, event.answer || answer, context);
+                    logTrace(event.trace_id, "Completed", "Chat Request");
+                } else if (event.type === 'error') {
+                    throw new Error(event.error);
+                }
+            });
         } catch (error) {
             removeTypingIndicator();
             addMessage("Sorry, I encountered an error processing your request.", 'bot');
@@ -51,6 +69,30 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Parses a text/event-stream body, calling onEvent with each decoded `data:` payload
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                const data = raw.split('\n')
+                    .filter(line => line.startsWith('data:'))
+                    .map(line => line.slice(5).trim())
+                    .join('\n');
+                if (data) onEvent(JSON.parse(data));
+            }
+        }
+    }
+
     function addMessage(text, sender, context = null) {
         // Clear welcome if present
         if (chatMessages.querySelector('.flex-col.items-center')) {
@@ -66,6 +108,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 : 'bg-white/10 text-gray-200 border border-white/5 rounded-tl-none'
             }`;
 
+        setBubbleText(bubble, text, context);
+
+        div.appendChild(bubble);
+        chatMessages.appendChild(div);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+        return bubble;
+    }
+
+    function setBubbleText(bubble, text, context = null) {
         // Markdown-ish parsing (basic)
         const formatText = (str) => {
             return str
@@ -85,8 +136,6 @@ document.addEventListener('DOMContentLoaded', () => {
             bubble.appendChild(details);
         }
 
-        div.appendChild(bubble);
-        chatMessages.appendChild(div);
         chatMessages.scrollTop = chatMessages.scrollHeight;
     }
 
@@ -137,38 +186,53 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     async function handleFiles(files) {
-        for (const file of files) {
-            await uploadFile(file);
-        }
-    }
-
-    async function uploadFile(file) {
-        const id = Math.random().toString(36).substr(2, 9);
-        addFileItem(file.name, id, 'uploading');
+        files = Array.from(files);
+        if (!files.length) return;
+        // One background job for the whole selection; poll it for per-file progress
+        const ids = files.map(file => {
+            const id = Math.random().toString(36).substr(2, 9);
+            addFileItem(file.name, id, 'uploading');
+            return id;
+        });
 
         const formData = new FormData();
-        formData.append('file', file);
+        files.forEach(file => formData.append('files', file));
 
         try {
-            const response = await fetch('/upload', {
+            const response = await fetch('/jobs', {
                 method: 'POST',
                 body: formData
             });
-
             if (!response.ok) throw new Error('Upload failed');
-
-            const data = await response.json();
-            updateFileStatus(id, 'done');
-            showToast(`Uploaded ${file.name}`, 'success');
-
-            // Log MCP Trace
-            if (data.result && data.result.trace_id) {
-                logTrace(data.result.trace_id, "Ingestion Complete", `Uploaded ${file.name}`);
-            }
-
+            const job = await response.json();
+            await pollJob(job.job_id, files, ids);
         } catch (error) {
-            updateFileStatus(id, 'error');
-            showToast(`Failed to upload ${file.name}`, 'error');
+            ids.forEach(id => updateFileStatus(id, 'error'));
+            showToast('Failed to upload files', 'error');
+        }
+    }
+
+    async function pollJob(jobId, files, ids) {
+        const settled = new Set();
+        while (settled.size < files.length) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const response = await fetch(`/jobs/${jobId}`);
+            if (!response.ok) throw new Error('Job lookup failed');
+            const job = await response.json();
+
+            job.files.forEach((fileState, i) => {
+                if (settled.has(i)) return;
+                if (fileState.status === 'succeeded') {
+                    settled.add(i);
+                    updateFileStatus(ids[i], 'done');
+                    showToast(`Uploaded ${files[i].name}`, 'success');
+                    logTrace(jobId, "Ingestion Complete", `${files[i].name}: ${fileState.chunks_count} chunks`);
+                } else if (fileState.status === 'failed' || fileState.status === 'cancelled') {
+                    settled.add(i);
+                    updateFileStatus(ids[i], 'error');
+                    showToast(`Failed to upload ${files[i].name}`, 'error');
+                }
+            });
         }
     }
 